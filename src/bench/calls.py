@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Per-call overhead of Lox functions on each engine.
+
+    python3 calls.py [calls]
+
+"flat" calls a one-line function in a loop and subtracts the cost of the same
+loop without the call. "recursive" returns through a chain of 100 nested calls
+at a time, which is where unwinding a return through every frame shows up.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from __init__ import Pylox
+
+LOOP = """
+var i = 0;
+while (i < {calls}) {{
+  i = i + 1;
+}}
+"""
+
+FLAT = """
+fun identity(n) {{
+  return n;
+}}
+var i = 0;
+while (i < {calls}) {{
+  identity(i);
+  i = i + 1;
+}}
+"""
+
+RECURSIVE = """
+fun down(n) {{
+  if (n == 0) return 0;
+  return down(n - 1);
+}}
+var i = 0;
+while (i < {chains}) {{
+  down(99);
+  i = i + 1;
+}}
+"""
+
+def run(source: str, engine: str) -> float:
+    Pylox.engine = engine
+    Pylox.interpreter = Pylox.create_interpreter()
+    start: float = time.perf_counter()
+    Pylox.run(source)
+    return time.perf_counter() - start
+
+def main(args: list[str]) -> None:
+    calls: int = int(args[0]) if args else 100000
+    chains: int = calls // 100
+
+    print(f"{'engine':<8} {'flat us/call':>14} {'recursive us/call':>18}")
+    for engine in Pylox.ENGINES:
+        loop: float = run(LOOP.format(calls=calls), engine)
+        flat: float = run(FLAT.format(calls=calls), engine) - loop
+        recursive: float = run(RECURSIVE.format(chains=chains), engine)
+        print(f"{engine:<8} {flat / calls * 1e6:>14.2f} {recursive / (chains * 100) * 1e6:>18.2f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
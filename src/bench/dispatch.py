@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+accept() double dispatch against per-instance dispatch tables.
+
+    python3 dispatch.py [megabytes]
+
+Times the Interpreter running a small numeric program, the Resolver over a
+generated source and the AstPrinter over many expressions, each built once
+with dispatch=False (node.accept()) and once with dispatch=True (the table).
+Reports the best of three runs of each.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from __init__ import Pylox
+from interpreter import Interpreter
+from resolver import Resolver
+from astprinter import AstPrinter
+from scanner import RegexScanner
+from parser import Parser
+from scanning import generate
+
+PROGRAM = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 2) + fib(n - 1);
+}
+var total = 0;
+var i = 0;
+while (i < 20000) {
+  total = total + i * 2 - (i / 3);
+  i = i + 1;
+}
+total = total + fib(17);
+"""
+
+EXPRESSION = "(a{i} + {i}) * -b - c / 2 == d or !e and f(g, h = {i}) != nil;\n"
+
+def parse(source: str) -> list:
+    return Parser(RegexScanner(source).scan_tokens()).parse()
+
+def interpreter(dispatch: bool) -> float:
+    Pylox.interpreter = Interpreter(dispatch)
+    statements: list = parse(PROGRAM)
+    Resolver(Pylox.interpreter, dispatch).resolve(statements)
+    start: float = time.perf_counter()
+    Pylox.interpreter.interpret(statements)
+    return time.perf_counter() - start
+
+def resolver(statements: list):
+    def run(dispatch: bool) -> float:
+        visitor: Resolver = Resolver(Interpreter(), dispatch)
+        start: float = time.perf_counter()
+        visitor.resolve(statements)
+        return time.perf_counter() - start
+    return run
+
+def printer(expressions: list):
+    def run(dispatch: bool) -> float:
+        visitor: AstPrinter = AstPrinter(dispatch)
+        start: float = time.perf_counter()
+        for expression in expressions:
+            visitor.print(expression)
+        return time.perf_counter() - start
+    return run
+
+def main(args: list[str]) -> None:
+    megabytes: float = float(args[0]) if args else 1.0
+    statements: list = parse(generate(megabytes))
+    expressions: list = [statement.expression for statement in parse("".join(EXPRESSION.format(i=i) for i in range(20000)))]
+
+    print(f"{'visitor':<12} {'accept (s)':>10} {'table (s)':>10} {'speedup':>8}")
+    for name, run in (("Interpreter", interpreter), ("Resolver", resolver(statements)), ("AstPrinter", printer(expressions))):
+        accept: float = min(run(False) for _ in range(3))
+        table: float = min(run(True) for _ in range(3))
+        print(f"{name:<12} {accept:>10.3f} {table:>10.3f} {accept / table:>7.2f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cost of reading global variables and calling global functions on each engine.
+
+    python3 globals.py [iterations]
+
+"local" adds two locals in a loop inside a function, "read" adds two globals
+instead and "call" calls a global function instead. Reports the best time per
+iteration of five runs, so the difference to "local" is what the global
+accesses cost.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from __init__ import Pylox
+
+LOOP = """
+fun run() {{
+  var i = 0;
+  var x = 0;
+  while (i < {iterations}) {{
+    x = i + i;
+    i = i + 1;
+  }}
+}}
+run();
+"""
+
+READ = """
+var a = 1;
+var b = 2;
+fun run() {{
+  var i = 0;
+  var x = 0;
+  while (i < {iterations}) {{
+    x = a + b;
+    i = i + 1;
+  }}
+}}
+run();
+"""
+
+CALL = """
+fun one() {{
+  return 1;
+}}
+fun run() {{
+  var i = 0;
+  var x = 0;
+  while (i < {iterations}) {{
+    x = one();
+    i = i + 1;
+  }}
+}}
+run();
+"""
+
+def run(source: str, engine: str) -> float:
+    Pylox.engine = engine
+    Pylox.interpreter = Pylox.create_interpreter()
+    start: float = time.perf_counter()
+    Pylox.run(source)
+    return time.perf_counter() - start
+
+def main(args: list[str]) -> None:
+    iterations: int = int(args[0]) if args else 100000
+
+    print(f"{'engine':<8} {'local us':>9} {'read us':>9} {'call us':>9}")
+    for engine in Pylox.ENGINES:
+        times: list[float] = [min(run(program.format(iterations=iterations), engine) for _ in range(5)) / iterations * 1e6
+                              for program in (LOOP, READ, CALL)]
+        print(f"{engine:<8}" + "".join(f" {us:>9.3f}" for us in times))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
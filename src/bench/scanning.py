@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Scanner against RegexScanner on the same generated source.
+
+    python3 scanning.py [megabytes]
+
+Checks that both produce an identical token stream before timing them.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from scanner import Scanner, RegexScanner
+
+UNIT = """
+// Generated function {i}.
+fun function{i}(a, b) {{
+  var total = a * {i}.5 + b - (a / 2);
+  if (total >= 10 and b != 3 or !false) {{
+    total = total - 1;
+  }} else {{
+    total = total + 1;
+  }}
+  while (total < 100) total = total * 2;
+  return "result " + "{i}";
+}}
+print function{i}(1, 2);
+"""
+
+def generate(megabytes: float) -> str:
+    units: list[str] = []
+    size: int = 0
+    i: int = 0
+    while size < megabytes * 1024 * 1024:
+        unit: str = UNIT.format(i=i)
+        units.append(unit)
+        size += len(unit)
+        i += 1
+    return "".join(units)
+
+def best_of(runs: int, scanner: type, source: str) -> tuple[float, list]:
+    best: float = float("inf")
+    tokens: list = []
+    for _ in range(runs):
+        start: float = time.perf_counter()
+        tokens = scanner(source).scan_tokens()
+        best = min(best, time.perf_counter() - start)
+    return best, tokens
+
+def main(args: list[str]) -> None:
+    megabytes: float = float(args[0]) if args else 2.0
+    source: str = generate(megabytes)
+
+    book_time, book_tokens = best_of(1, Scanner, source)
+    regex_time, regex_tokens = best_of(3, RegexScanner, source)
+
+    same: bool = [(t.tokentype, t.lexeme, t.literal, t.line) for t in book_tokens] == \
+                 [(t.tokentype, t.lexeme, t.literal, t.line) for t in regex_tokens]
+
+    print(f"source: {len(source) / 1024 / 1024:.1f} MB, {len(regex_tokens)} tokens, identical streams: {same}")
+    print(f"{'scanner':<14} {'seconds':>8} {'MB/s':>8}")
+    for name, elapsed in (("Scanner", book_time), ("RegexScanner", regex_time)):
+        print(f"{name:<14} {elapsed:>8.3f} {len(source) / 1024 / 1024 / elapsed:>8.2f}")
+    print(f"speedup: {book_time / regex_time:.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Memory and latency of parsing a whole file against streaming it.
+
+    python3 streaming.py [megabytes]
+
+Writes a generated source next to this script, then parses it both ways, each
+in a fresh process, and reports how long it took until the first top-level
+statement was ready to run and the peak resident memory of the process.
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from scanner import RegexScanner
+from parser import Parser
+from scanning import generate
+
+def whole(path: str) -> tuple[float, int]:
+    start: float = time.perf_counter()
+    with open(path) as f:
+        statements: list = Parser(RegexScanner(f.read()).scan_tokens()).parse()
+    return time.perf_counter() - start, len(statements)
+
+def streamed(path: str) -> tuple[float, int]:
+    start: float = time.perf_counter()
+    first: float = 0.0
+    count: int = 0
+    with open(path) as f:
+        for _ in Parser(RegexScanner(f).stream_tokens()).parse_iter():
+            # Dropped straight away, as if it had been run.
+            if count == 0:
+                first = time.perf_counter() - start
+            count += 1
+    return first, count
+
+MODES = {"whole": whole, "stream": streamed}
+
+def measure(mode: str, path: str) -> None:
+    first, count = MODES[mode](path)
+    # Kilobytes on Linux.
+    peak: float = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<8} {count:>10} {first:>10.3f} {peak:>8.1f}")
+
+def main(args: list[str]) -> None:
+    if len(args) == 2 and args[0] in MODES:
+        measure(*args)
+        return
+
+    if len(args) == 3 and args[0] == "generate":
+        with open(args[2], "w") as f:
+            f.write(generate(float(args[1])))
+        return
+
+    # Linux carries the peak over from a forked parent, so this process stays
+    # small and leaves generating the source to a child of its own as well.
+    megabytes: str = args[0] if args else "2"
+    path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streaming.lox")
+    subprocess.run([sys.executable, os.path.abspath(__file__), "generate", megabytes, path], check=True)
+    try:
+        print(f"source: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        print(f"{'mode':<8} {'statements':>10} {'first (s)':>10} {'peak MB':>8}")
+        sys.stdout.flush()
+        for mode in MODES:
+            subprocess.run([sys.executable, os.path.abspath(__file__), mode, path], check=True)
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Runs the corpus of Lox workloads phase by phase and tracks regressions.
+
+    python3 suite.py [--repeat=N] [--engine=tree|closure|vm|stack|async] [--output=results.json]
+                     [--baseline=baseline.json] [--threshold=0.20] [--save-baseline]
+                     [workload ...]
+
+Every workload is a program in corpus/, plus "generated", a large source from
+scanning.py. Each runs in a fresh process, which scans, parses, optimizes,
+resolves and interprets it as separate phases, keeping the best time of each
+phase over --repeat runs and the peak resident memory of the whole process.
+The interpreter and resolver are the ones `pylox --engine=...` would use.
+
+The results go to --output as JSON. They are then compared with --baseline:
+any phase slower than the baseline by more than --threshold (and by more than
+a few milliseconds, which is noise at this scale) is flagged, and the exit
+status is 1. --save-baseline writes the results to --baseline instead. The
+stored baseline was recorded on one particular machine, so save a fresh one
+before comparing anywhere else.
+"""
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+HERE: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "pylox"))
+
+from __init__ import Pylox
+from scanner import RegexScanner
+from parser import Parser
+from optimizer import Optimizer
+from scanning import generate
+
+CORPUS: str = os.path.join(HERE, "corpus")
+PHASES: tuple[str, ...] = ("scan", "parse", "optimize", "resolve", "interpret")
+# Differences below this many seconds are never reported.
+NOISE: float = 0.005
+
+def workloads() -> dict[str, str]:
+    programs: dict[str, str] = {}
+    for filename in sorted(os.listdir(CORPUS)):
+        if filename.endswith(".lox"):
+            with open(os.path.join(CORPUS, filename)) as f:
+                programs[filename[:-4]] = f.read()
+    programs["generated"] = generate(1.0)
+    return programs
+
+def run_phases(source: str) -> dict[str, float]:
+    timings: dict[str, float] = {}
+
+    def phase(name: str, step):
+        start: float = time.perf_counter()
+        result = step()
+        timings[name] = time.perf_counter() - start
+        if Pylox.had_error:
+            raise SystemExit(f"{name} failed")
+        return result
+
+    Pylox.interpreter = Pylox.create_interpreter()
+    tokens: list = phase("scan", lambda: RegexScanner(source).scan_tokens())
+    statements: list = phase("parse", lambda: Parser(tokens).parse())
+    statements = phase("optimize", lambda: Optimizer().optimize(statements))
+    phase("resolve", lambda: Pylox.create_resolver().resolve(statements))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        phase("interpret", lambda: Pylox.execute(statements))
+    if Pylox.had_runtime_error:
+        raise SystemExit("interpret failed")
+    return timings
+
+def child(name: str, repeat: int) -> None:
+    source: str = workloads()[name]
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        for phase, seconds in run_phases(source).items():
+            best[phase] = min(best.get(phase, seconds), seconds)
+
+    result: dict = dict(best)
+    result["total"] = sum(best.values())
+    # Kilobytes on Linux.
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions: list[str] = []
+    for name, phases in results["workloads"].items():
+        before: dict | None = baseline.get("workloads", {}).get(name)
+        if before is None:
+            continue
+        for phase in (*PHASES, "total"):
+            if phase not in before:
+                continue
+            old, new = before[phase], phases[phase]
+            if new > old * (1 + threshold) and new - old > NOISE:
+                regressions.append(f"{name} {phase}: {old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+def main(args: list[str]) -> None:
+    if len(args) == 4 and args[0] == "--child":
+        Pylox.engine = args[3]
+        child(args[1], int(args[2]))
+        return
+
+    options: dict[str, str] = {}
+    names: list[str] = []
+    for arg in args:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            options[name] = value
+        else:
+            names.append(arg)
+
+    repeat: int = int(options.get("repeat", 5))
+    engine: str = options.get("engine", "tree")
+    if engine not in Pylox.ENGINES:
+        raise SystemExit(f"unknown engine {engine!r}, expected one of {', '.join(Pylox.ENGINES)}")
+    output: str = options.get("output", os.path.join(HERE, "results.json"))
+    baseline_path: str = options.get("baseline", os.path.join(HERE, "baseline.json"))
+    threshold: float = float(options.get("threshold", 0.20))
+    names = names or list(workloads())
+
+    results: dict = {
+        "python": platform.python_version(),
+        "engine": engine,
+        "repeat": repeat,
+        "workloads": {},
+    }
+
+    print(f"{'workload':<12}" + "".join(f"{phase:>11}" for phase in (*PHASES, "total")) + f"{'peak MB':>9}")
+    for name in names:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, str(repeat), engine],
+                                   check=True, capture_output=True, text=True)
+        phases: dict = json.loads(completed.stdout)
+        results["workloads"][name] = phases
+        print(f"{name:<12}" + "".join(f"{phases[phase]:>11.4f}" for phase in (*PHASES, "total")) + f"{phases['peak_rss_mb']:>9.1f}")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if "save-baseline" in options:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path}")
+        return
+
+    with open(baseline_path) as f:
+        baseline: dict = json.load(f)
+    if baseline.get("engine") != engine:
+        print(f"baseline was recorded with the {baseline.get('engine')} engine, not {engine}")
+        return
+
+    regressions: list[str] = compare(results, baseline, threshold)
+    if regressions:
+        print(f"regressions over {threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("no regressions")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
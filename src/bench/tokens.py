@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Memory held by the tokens of a generated source.
+
+    python3 tokens.py [megabytes]
+
+Scans the same source as scanning.py and adds up the size of every token
+together with the lexeme, literal and line objects it references, counting an
+object shared by several tokens only once.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox"))
+
+from scanner import Scanner, RegexScanner
+from scanning import generate
+
+def footprint(tokens: list) -> int:
+    seen: set[int] = set()
+    total: int = sys.getsizeof(tokens)
+    for token in tokens:
+        total += sys.getsizeof(token)
+        if hasattr(token, "__dict__"):
+            total += sys.getsizeof(token.__dict__)
+        # The token types are shared enum members either way.
+        for value in (token.lexeme, token.literal, token.line):
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+def main(args: list[str]) -> None:
+    megabytes: float = float(args[0]) if args else 2.0
+    source: str = generate(megabytes)
+    print(f"source: {len(source) / 1024 / 1024:.1f} MB")
+    print(f"{'scanner':<14} {'tokens':>9} {'MB':>8} {'bytes/token':>12} {'seconds':>8}")
+
+    for scanner in (Scanner, RegexScanner):
+        start: float = time.perf_counter()
+        tokens: list = scanner(source).scan_tokens()
+        elapsed: float = time.perf_counter() - start
+        size: int = footprint(tokens)
+        print(f"{scanner.__name__:<14} {len(tokens):>9} {size / 1024 / 1024:>8.1f} {size / len(tokens):>12.1f} {elapsed:>8.3f}")
+        del tokens
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
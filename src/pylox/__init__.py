@@ -1,4 +1,7 @@
+import os
 import sys
+from itertools import islice
+from typing import Iterable, Iterator
 import runtimeerror
 import stmt
 from token import Token, TokenType
@@ -8,25 +11,123 @@ class Pylox:
     had_error = False
     had_runtime_error = False
     interpreter = None
+    # "tree" walks the AST with the Interpreter, "closure" compiles it to
+    # Python closures with the ClosureCompiler first and "vm" compiles it to
+    # bytecode for the VM. "stack" walks the AST too, but with an explicit
+    # stack instead of recursion, so trees and call chains of any depth run.
+    # "async" runs that machine as a coroutine, awaiting async natives.
+    engine = "tree"
+    ENGINES = ("tree", "closure", "vm", "stack", "async")
+    # Scripts run from a file keep their resolved tree in __loxcache__.
+    use_cache = True
+    # "regex" splits the source with RegexScanner's master pattern, "book"
+    # scans character by character with the original Scanner.
+    scanner = "regex"
+    SCANNERS = ("regex", "book")
+    # Run each top-level statement of a script as soon as it has been parsed
+    # instead of reading the whole file first.
+    stream = False
+    # Fold constants and prune dead branches with the Optimizer before
+    # resolving, and print the tree before and after it to stderr.
+    optimize = True
+    dump_ast = False
+    # Profile a script on the tree-walking interpreter, printing a report to
+    # stderr and writing its call stacks next to it as <script>.folded.
+    profile = False
+    # Run every script given in its own interpreter, across a pool of jobs
+    # worker processes (one per CPU if None), and report on all of them.
+    batch = False
+    jobs = None
+    # Drop into the REPL after running a script, with its definitions.
+    interactive = False
+    VERSION = "0.1.0"
+    USAGE = "Usage: pylox [--engine=tree|closure|vm|stack|async] [--scanner=regex|book] [--no-cache] [--stream] [--no-optimize] [--dump-ast] [--profile] [--interactive] [script]\n       pylox --batch [--jobs=N] [--engine=...] [--scanner=...] [--no-cache] [--stream] [--no-optimize] script..."
 
     def __init__(self) -> None:
         pass
     
     @staticmethod
     def main(args: list[str]) -> None:
+        for option in [arg for arg in args if arg.startswith("--")]:
+            name, _, value = option[2:].partition("=")
+            if name == "engine" and value in Pylox.ENGINES:
+                Pylox.engine = value
+            elif name == "scanner" and value in Pylox.SCANNERS:
+                Pylox.scanner = value
+            elif name == "no-cache" and not value:
+                Pylox.use_cache = False
+            elif name == "stream" and not value:
+                Pylox.stream = True
+            elif name == "no-optimize" and not value:
+                Pylox.optimize = False
+            elif name == "dump-ast" and not value:
+                Pylox.dump_ast = True
+            elif name == "profile" and not value:
+                Pylox.profile = True
+            elif name == "interactive" and not value:
+                Pylox.interactive = True
+            elif name == "batch" and not value:
+                Pylox.batch = True
+            elif name == "jobs" and value.isdigit() and int(value) > 0:
+                Pylox.jobs = int(value)
+            else:
+                print(Pylox.USAGE)
+                sys.exit(64)
+        args = [arg for arg in args if not arg.startswith("--")]
+
+        if Pylox.batch and (Pylox.profile or Pylox.dump_ast or Pylox.interactive):
+            # A batch only shows what a script printed if it failed, and has
+            # no single script to stay in afterwards.
+            print(Pylox.USAGE)
+            sys.exit(64)
+
+        if Pylox.batch:
+            from batch import run_batch, report
+            sys.exit(report(run_batch(args, Pylox.jobs)))
+
         if len(args) > 1:
-            print("Usage: pylox [script]")
+            print(Pylox.USAGE)
             sys.exit(64)
         elif len(args) == 1:
             Pylox.run_file(args[0])
+            if Pylox.interactive:
+                Pylox.had_error = False
+                Pylox.had_runtime_error = False
+                Pylox.run_prompt()
         else:
             Pylox.run_prompt()
 
     @staticmethod
     def run_file(path: str) -> None:
+        cache: 'ScriptCache' = None
+        # Dumping the tree needs it parsed, so it bypasses the cache.
+        if Pylox.use_cache and not Pylox.stream and not Pylox.dump_ast:
+            from scriptcache import ScriptCache
+            cache = ScriptCache(path)
+
+        profiler: 'Profiler' = None
+        if Pylox.profile:
+            from profiler import Profiler, ProfilingInterpreter
+            profiler = Profiler()
+            Pylox.interpreter = ProfilingInterpreter(profiler)
+            Pylox.engine = "tree"
+            profiler.start()
+
         with open(path, "r") as f:
-            Pylox.run(f.read())
+            if Pylox.stream:
+                Pylox.run_stream(f)
+            else:
+                Pylox.run(f.read(), cache)
+
+        if profiler is not None:
+            profiler.stop()
+            profiler.report(sys.stderr)
+            with open(f"{os.path.splitext(path)[0]}.folded", "w") as f:
+                profiler.write_collapsed(f)
         
+        if Pylox.interactive:
+            return
+
         if Pylox.had_error:
             sys.exit(65)
         
@@ -35,38 +136,185 @@ class Pylox:
 
     @staticmethod
     def run_prompt() -> None:
+        from session import Session
+
+        session: Session = Session()
         while True:
             try:
-                Pylox.run(input("pylox> "))
-                Pylox.had_error = False
-            except KeyboardInterrupt:
+                session.feed(input(session.prompt))
+            except (KeyboardInterrupt, EOFError):
                 break
 
     @staticmethod
-    def run(source: str) -> None:
-        # Importing scanner, parser, and interpreter here to avoid circular import
-        from scanner import Scanner
-        from parser import Parser
+    def run(source: str, cache: 'ScriptCache' = None) -> None:
+        if Pylox.interpreter is None:
+            Pylox.interpreter = Pylox.create_interpreter()
 
-        scanner: Scanner = Scanner(source)
-        tokens: list[Token] = scanner.scan_tokens()
+        cached: tuple[list[stmt.Stmt], dict, dict] | None = None
+        if cache is not None:
+            cached = cache.load(source)
+
+        if cached is not None:
+            statements, resolved, tail_calls = cached
+            Pylox.interpreter.locals.update(resolved)
+            Pylox.interpreter.tail_calls.update(tail_calls)
+        else:
+            first_local: int = len(Pylox.interpreter.locals)
+            first_tail_call: int = len(Pylox.interpreter.tail_calls)
+            statements = Pylox.parse(source)
+
+            if Pylox.had_error:
+                return
+
+            if cache is not None:
+                # The resolver's tables only ever grow, so whatever was added
+                # past first_local and first_tail_call belongs to this script.
+                resolved = dict(islice(Pylox.interpreter.locals.items(), first_local, None))
+                tail_calls = dict(islice(Pylox.interpreter.tail_calls.items(), first_tail_call, None))
+                cache.store(source, statements, resolved, tail_calls)
+
+        Pylox.execute(statements)
+
+    @staticmethod
+    def run_stream(lines: Iterable[str]) -> None:
+        # Scans, parses, resolves and runs one top-level statement at a time,
+        # so tokens and statements that already ran are never kept around.
+        # Unlike run(), statements before a syntax error have already run by
+        # the time it is reported; nothing after it does.
+        from scanner import RegexScanner
+        from parser import Parser
+        from optimizer import Optimizer
 
         if Pylox.interpreter is None:
-            from interpreter import Interpreter
-            Pylox.interpreter = Interpreter()
+            Pylox.interpreter = Pylox.create_interpreter()
+
+        parser: Parser = Parser(RegexScanner(lines).stream_tokens())
+        resolver: 'Resolver' = Pylox.create_resolver()
+        optimizer: Optimizer = Optimizer()
+
+        def statements() -> Iterator[list[stmt.Stmt]]:
+            for statement in parser.parse_iter():
+                if Pylox.had_error:
+                    # Keep parsing to report every syntax error, but stop running.
+                    continue
+
+                optimized: list[stmt.Stmt] = Pylox.optimize_tree([statement], optimizer)
+                if not optimized:
+                    continue
+
+                resolver.resolve(optimized[0])
+                if Pylox.had_error:
+                    continue
+
+                yield optimized
+                if Pylox.had_runtime_error:
+                    return
+                Pylox.interpreter.clear_caches()
+
+        Pylox.execute_each(statements())
+
+    @staticmethod
+    def execute(statements: list[stmt.Stmt]) -> None:
+        Pylox.execute_each([statements])
+
+    @staticmethod
+    def execute_each(programs: Iterable[list[stmt.Stmt]]) -> None:
+        # Runs each list of statements in turn on the one closure compiler, VM
+        # or event loop, which is all that differs between running a whole
+        # file and a stream of statements.
+        try:
+            if Pylox.engine == "closure":
+                from closurecompiler import ClosureCompiler
+                compiler: ClosureCompiler = ClosureCompiler(Pylox.interpreter)
+                for statements in programs:
+                    compiler.interpret(statements)
+            elif Pylox.engine == "vm":
+                from compiler import Compiler
+                from vm import VM
+                vm: VM = VM(Pylox.interpreter)
+                for statements in programs:
+                    # A compiler only ever fills the one chunk.
+                    script = Compiler(Pylox.interpreter).compile(statements)
+                    if not Pylox.had_error:
+                        vm.interpret(script)
+            elif Pylox.engine == "async":
+                from stdlib import import_stdlib
+                import_stdlib("asyncio")
+                import asyncio
+
+                async def interpret_each() -> None:
+                    for statements in programs:
+                        await Pylox.interpreter.interpret_async(statements)
+                asyncio.run(interpret_each())
+            else:
+                for statements in programs:
+                    Pylox.interpreter.interpret(statements)
+        finally:
+            # Print statements write to a buffer, which writes itself out as it
+            # fills up; make sure the rest got out too.
+            Pylox.interpreter.output.flush()
+
+    @staticmethod
+    def parse(source: str) -> list[stmt.Stmt]:
+        # Importing scanner and parser here (and the resolver in
+        # create_resolver()) to avoid circular import
+        from scanner import Scanner, RegexScanner
+        from parser import Parser
+
+        scanner: Scanner | RegexScanner = RegexScanner(source) if Pylox.scanner == "regex" else Scanner(source)
+        tokens: list[Token] = scanner.scan_tokens()
 
         parser: Parser = Parser(tokens)
         statements: list[stmt.Stmt] = parser.parse()
 
         if Pylox.had_error:
-            return
-        
-        from resolver import Resolver
-        resolver: Resolver = Resolver(Pylox.interpreter)
+            return statements
+
+        statements = Pylox.optimize_tree(statements)
+
+        resolver: 'Resolver' = Pylox.create_resolver()
         for statement in statements:
             resolver.resolve(statement)
-        
-        Pylox.interpreter.interpret(statements)
+
+        return statements
+
+    @staticmethod
+    def create_interpreter() -> 'Interpreter':
+        if Pylox.engine == "stack":
+            from stackinterpreter import StackInterpreter
+            return StackInterpreter()
+        if Pylox.engine == "async":
+            from asyncinterpreter import AsyncInterpreter
+            return AsyncInterpreter()
+        from interpreter import Interpreter
+        return Interpreter()
+
+    @staticmethod
+    def create_resolver() -> 'Resolver':
+        if Pylox.engine in ("stack", "async"):
+            from stackinterpreter import StackResolver
+            return StackResolver(Pylox.interpreter)
+        from resolver import Resolver
+        return Resolver(Pylox.interpreter)
+
+    @staticmethod
+    def optimize_tree(statements: list[stmt.Stmt], optimizer: 'Optimizer' = None) -> list[stmt.Stmt]:
+        from optimizer import Optimizer
+        from astprinter import AstPrinter
+
+        if Pylox.dump_ast:
+            printer: AstPrinter = AstPrinter()
+            for statement in statements:
+                print(f"before: {printer.print(statement)}", file=sys.stderr)
+
+        if Pylox.optimize:
+            statements = (optimizer or Optimizer()).optimize(statements)
+
+            if Pylox.dump_ast:
+                for statement in statements:
+                    print(f"after:  {printer.print(statement)}", file=sys.stderr)
+
+        return statements
 
     @staticmethod
     def error(location: int | Token, message: str) -> None:
@@ -80,6 +328,9 @@ class Pylox:
     
     @staticmethod
     def runtime_error(error: runtimeerror.RuntimeError) -> None:
+        # Whatever the program printed before failing comes first.
+        if Pylox.interpreter is not None:
+            Pylox.interpreter.output.flush()
         print(f"{error.message}\n[line {error.token.line}]")
         Pylox.had_runtime_error = True
 
@@ -89,4 +340,7 @@ class Pylox:
         Pylox.had_error = True;
 
 if __name__ == "__main__":
+    # The other modules import Pylox from `__init__`, so go through that module
+    # rather than this `__main__` copy or the error flags end up split in two.
+    from __init__ import Pylox
     Pylox.main(sys.argv[1:])
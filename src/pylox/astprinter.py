@@ -1,28 +1,88 @@
 import expr
+import stmt
+from dispatch import dispatch_table
 
-class AstPrinter(expr.Visitor):
-    def print(self, expr: expr.Expr) -> str:
-        return expr.accept(self)
+class AstPrinter(expr.Visitor, stmt.Visitor):
+    def __init__(self, dispatch: bool = True) -> None:
+        self.handlers = dispatch_table(self, dispatch)
+
+    def print(self, expr: expr.Expr | stmt.Stmt) -> str:
+        return self.handlers[type(expr)](expr)
+
+    def visit_block_stmt(self, statement: stmt.Block) -> str:
+        return self.parenthesize("block", *statement.statements)
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> str:
+        return self.parenthesize(";", statement.expression)
+
+    def visit_function_stmt(self, statement: stmt.Function) -> str:
+        params: str = " ".join(param.lexeme for param in statement.params)
+        return self.parenthesize(f"fun {statement.name.lexeme} ({params})", *statement.body)
+
+    def visit_if_stmt(self, statement: stmt.If) -> str:
+        if statement.else_branch is None:
+            return self.parenthesize("if", statement.condition, statement.then_branch)
+        return self.parenthesize("if-else", statement.condition, statement.then_branch, statement.else_branch)
+
+    def visit_print_stmt(self, statement: stmt.Print) -> str:
+        return self.parenthesize("print", statement.expression)
+
+    def visit_return_stmt(self, statement: stmt.Return) -> str:
+        if statement.value is None:
+            return "(return)"
+        return self.parenthesize("return", statement.value)
+
+    def visit_var_stmt(self, statement: stmt.Var) -> str:
+        if statement.initializer is None:
+            return f"(var {statement.name.lexeme})"
+        return self.parenthesize(f"var {statement.name.lexeme}", statement.initializer)
+
+    def visit_while_stmt(self, statement: stmt.While) -> str:
+        return self.parenthesize("while", statement.condition, statement.body)
+
+    def visit_assign_expr(self, expr: expr.Assign) -> str:
+        return self.parenthesize(f"= {expr.name.lexeme}", expr.value)
 
     def visit_binary_expr(self, expr: expr.Binary) -> str:
         return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
     
+    def visit_call_expr(self, expr: expr.Call) -> str:
+        return self.parenthesize("call", expr.callee, *expr.arguments)
+
+    def visit_array_expr(self, expr: expr.Array) -> str:
+        return self.parenthesize("array", *expr.elements)
+
+    def visit_index_expr(self, expr: expr.Index) -> str:
+        return self.parenthesize("index", expr.sequence, expr.index)
+
+    def visit_setindex_expr(self, expr: expr.SetIndex) -> str:
+        return self.parenthesize("setindex", expr.sequence, expr.index, expr.value)
+
     def visit_grouping_expr(self, expr: expr.Grouping) -> str:
         return self.parenthesize("group", expr.expression)
 
     def visit_literal_expr(self, expr: expr.Literal) -> str:
         if expr.value is None:
             return "nil"
+        if isinstance(expr.value, str):
+            return f'"{expr.value}"'
         return str(expr.value)
     
+    def visit_logical_expr(self, expr: expr.Logical) -> str:
+        return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
+
     def visit_unary_expr(self, expr: expr.Unary) -> str:
         return self.parenthesize(expr.operator.lexeme, expr.right)
     
-    def parenthesize(self, name: str, *exprs: list[expr.Expr]) -> str:
+    def visit_variable_expr(self, expr: expr.Variable) -> str:
+        return expr.name.lexeme
+
+    def parenthesize(self, name: str, *exprs: list[expr.Expr | stmt.Stmt]) -> str:
+        handlers = self.handlers
         printed = ""
         printed += f"({name}"
         for expr in exprs:
-            printed += f" {expr.accept(self)}"
+            printed += f" {handlers[type(expr)](expr)}"
         printed += ")"
         return printed
 
@@ -39,4 +99,4 @@ if __name__ == "__main__":
         )
     )
 
-    print(AstPrinter().print(expression))
\ No newline at end of file
+    print(AstPrinter().print(expression))
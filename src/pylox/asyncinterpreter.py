@@ -0,0 +1,122 @@
+import expr
+import stmt
+from types import GeneratorType
+from typing import Awaitable, Callable, NamedTuple
+from token import Token
+import runtimeerror
+from __init__ import Pylox
+from completion import RETURN
+import loxcallable
+import natives
+from stackinterpreter import StackInterpreter, Visit
+from stdlib import import_stdlib
+
+# Both need the standard library's token module, through tokenize.
+import_stdlib("asyncio", "inspect")
+
+import asyncio
+import inspect
+
+class Await(NamedTuple):
+    # What a call yields for its native's awaitable result, with the call's
+    # closing parenthesis to blame if awaiting it fails.
+    awaitable: Awaitable
+    paren: Token
+
+async def drive_async(handlers: dict[type, Callable], visit: Visit) -> object:
+    """
+    drive(), except that a visit may also yield an Await, whose awaitable is
+    awaited here and its result sent back. The whole walk is one coroutine,
+    so other tasks on the loop run while a script waits.
+    """
+    stack: list[Visit] = [visit]
+    push = stack.append
+    value: object = None
+
+    try:
+        while True:
+            try:
+                child: expr.Expr | stmt.Stmt | Await = stack[-1].send(value)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                value = done.value
+                continue
+
+            handler: Callable | None = handlers.get(type(child))
+            if handler is None:
+                try:
+                    value = await child.awaitable
+                except natives.NativeError as error:
+                    raise runtimeerror.RuntimeError(child.paren, error.message) from None
+                continue
+
+            value = handler(child)
+            if type(value) is GeneratorType:
+                push(value)
+                value = None
+    except BaseException:
+        for visit in reversed(stack):
+            visit.close()
+        raise
+
+class AsyncNative(loxcallable.LoxCallable):
+    # Makes an async Python function callable from Lox, for the
+    # AsyncInterpreter to await. Any other interpreter would just get the
+    # coroutine back as a value.
+
+    # A coroutine can only be awaited once, so memo() must not hand the same
+    # one out again.
+    pure = False
+
+    def __init__(self, function: Callable[..., Awaitable], arity: int) -> None:
+        self.function = function
+        self.param_count: int = arity
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
+        return self.function(*arguments)
+
+    def __str__(self):
+        return "<native fn>"
+
+async def sleep(seconds: object) -> None:
+    # Lets a script give way to the other tasks on the loop, or stand in for
+    # a slow service.
+    await asyncio.sleep(seconds if isinstance(seconds, float) else 0.0)
+    return None
+
+natives.register("async", "sleep", AsyncNative(sleep, 1))
+
+class AsyncInterpreter(StackInterpreter):
+    """
+    Runs a program as a coroutine on the explicit-stack machine. Whenever a
+    native returns an awaitable, the script waits for it without blocking
+    the event loop, so many scripts can run as tasks side by side, each on
+    an AsyncInterpreter of its own.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        natives.install(self.globals, ("async",))
+
+    def visit_call_expr(self, expression: expr.Call) -> Visit:
+        result: object = yield from StackInterpreter.visit_call_expr(self, expression)
+        if inspect.isawaitable(result):
+            result = yield Await(result, expression.paren)
+        return result
+
+    async def interpret_async(self, statements: list[stmt.Stmt]) -> None:
+        try:
+            handlers = self.handlers
+            for statement in statements:
+                result: object = handlers[type(statement)](statement)
+                if type(result) is GeneratorType:
+                    result = await drive_async(handlers, result)
+                if result is RETURN:
+                    break
+        except runtimeerror.RuntimeError as error:
+            Pylox.runtime_error(error)
@@ -0,0 +1,108 @@
+import io
+import os
+import sys
+from contextlib import redirect_stdout, redirect_stderr
+from time import perf_counter
+from typing import Iterable, NamedTuple
+from __init__ import Pylox
+from stdlib import import_stdlib
+
+# The process pool needs the standard library's token module.
+import_stdlib("concurrent.futures", "multiprocessing", "traceback")
+
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# Class-level options of Pylox that each worker takes over from the process
+# that started the batch. Pylox.main() rejects the others with --batch.
+SETTINGS = ("engine", "scanner", "optimize", "use_cache", "stream")
+
+class ScriptResult(NamedTuple):
+    name: str
+    # 0, or 65 and 70 like `pylox script` would exit with. 1 if the
+    # interpreter itself crashed, with the traceback in stderr.
+    exit_code: int
+    stdout: str
+    stderr: str
+    seconds: float
+
+def run_script(name: str, source: str | None, settings: dict[str, object]) -> ScriptResult:
+    """
+    Runs one script in this worker with a fresh Interpreter and the error
+    flags cleared, capturing everything it prints. A source of None means
+    name is a path to read it from, with the script cache if enabled.
+    """
+    for setting, value in settings.items():
+        setattr(Pylox, setting, value)
+    Pylox.had_error = False
+    Pylox.had_runtime_error = False
+    Pylox.interpreter = None
+
+    stdout: io.StringIO = io.StringIO()
+    stderr: io.StringIO = io.StringIO()
+    start: float = perf_counter()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            if Pylox.stream:
+                # Streamed scripts aren't cached, just like on their own.
+                with open(name, "r") if source is None else io.StringIO(source) as lines:
+                    Pylox.run_stream(lines)
+            else:
+                cache: 'ScriptCache' = None
+                if source is None:
+                    with open(name, "r") as f:
+                        source = f.read()
+                    if Pylox.use_cache:
+                        from scriptcache import ScriptCache
+                        cache = ScriptCache(name)
+
+                Pylox.run(source, cache)
+            exit_code: int = 65 if Pylox.had_error else 70 if Pylox.had_runtime_error else 0
+        except Exception:
+            # The innermost frames are enough to tell what went wrong.
+            traceback.print_exc(limit=-3)
+            exit_code = 1
+    seconds: float = perf_counter() - start
+
+    # Nothing of this script should outlive it in a reused worker.
+    Pylox.interpreter = None
+    return ScriptResult(name, exit_code, stdout.getvalue(), stderr.getvalue(), seconds)
+
+def run_batch(scripts: Iterable[str | tuple[str, str]], workers: int | None = None) -> list[ScriptResult]:
+    """
+    Runs every script in its own interpreter across a pool of worker
+    processes, returning the results in the order given. A script is a path,
+    or a (name, source) pair to run without touching the disk.
+    """
+    tasks: list[tuple[str, str | None]] = [(script, None) if isinstance(script, str) else script for script in scripts]
+    if not tasks:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    settings: dict[str, object] = {setting: getattr(Pylox, setting) for setting in SETTINGS}
+    # A few chunks per worker keeps them all busy without a round trip per
+    # script when there are thousands.
+    chunksize: int = max(1, len(tasks) // (workers * 4))
+
+    # Forked workers inherit the modules as imported here, token included.
+    # Where there's no fork, workers import the pool's modules before this
+    # one, which only works when the pylox directory isn't first on the path.
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(run_script, *zip(*tasks), [settings] * len(tasks), chunksize=chunksize))
+
+def report(results: list[ScriptResult], out=sys.stdout) -> int:
+    # One line per script, the output of every script that failed, and the
+    # worst exit code as the batch's own.
+    for result in results:
+        print(f"{result.exit_code:3d} {result.seconds * 1000:10.2f} ms  {result.name}", file=out)
+    for result in results:
+        if result.exit_code != 0:
+            print(f"\n== {result.name} (exit {result.exit_code})", file=out)
+            print(result.stdout + result.stderr, end="", file=out)
+
+    failed: int = sum(1 for result in results if result.exit_code != 0)
+    total: float = sum(result.seconds for result in results)
+    print(f"\n{len(results)} scripts, {failed} failed, {total:.3f} s of interpreter time", file=out)
+    return max((result.exit_code for result in results), default=0)
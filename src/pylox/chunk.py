@@ -0,0 +1,124 @@
+from array import array
+from bisect import bisect_right
+from enum import IntEnum
+
+OPCODES = [
+    # Constants and the value stack.
+    "CONSTANT", "NIL", "TRUE", "FALSE", "POP",
+
+    # Variables. Locals live in slot-indexed frames, globals in the slots of
+    # the global environment.
+    "GET_LOCAL", "SET_LOCAL", "DEFINE_LOCAL", "GET_ENCLOSING", "SET_ENCLOSING",
+    "GET_GLOBAL", "SET_GLOBAL", "DEFINE_GLOBAL", "PUSH_SCOPE", "POP_SCOPE",
+
+    # Operators.
+    "EQUAL", "NOT_EQUAL", "GREATER", "GREATER_EQUAL", "LESS", "LESS_EQUAL",
+    "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "NOT", "NEGATE",
+
+    # Arrays.
+    "ARRAY", "GET_INDEX", "SET_INDEX",
+
+    # Statements and control flow.
+    "PRINT", "JUMP", "JUMP_IF_FALSE", "LOOP", "CALL", "CLOSURE", "RETURN",
+]
+
+OpCode = IntEnum("OpCode", OPCODES, start=0)
+
+# Number of operand bytes following each opcode.
+OPERAND_BYTES = {
+    OpCode.CONSTANT: 2,
+    OpCode.GET_LOCAL: 1,
+    OpCode.SET_LOCAL: 1,
+    OpCode.GET_ENCLOSING: 2,
+    OpCode.SET_ENCLOSING: 2,
+    OpCode.GET_GLOBAL: 2,
+    OpCode.SET_GLOBAL: 2,
+    OpCode.DEFINE_GLOBAL: 2,
+    OpCode.JUMP: 2,
+    OpCode.JUMP_IF_FALSE: 2,
+    OpCode.LOOP: 2,
+    OpCode.CALL: 1,
+    OpCode.ARRAY: 2,
+    OpCode.CLOSURE: 2,
+}
+
+class Chunk:
+
+    __slots__ = ("code", "constants", "constant_indices", "line_offsets", "line_numbers")
+
+    def __init__(self) -> None:
+        self.code: array = array('B')
+        self.constants: list[object] = []
+        self.constant_indices: dict[tuple[type, object], int] = {}
+
+        # Run-length encoded line table: line_numbers[i] applies to every byte
+        # from line_offsets[i] up to the next entry.
+        self.line_offsets: array = array('I')
+        self.line_numbers: array = array('I')
+
+    def write(self, byte: int, line: int) -> None:
+        if len(self.line_numbers) == 0 or self.line_numbers[-1] != line:
+            self.line_offsets.append(len(self.code))
+            self.line_numbers.append(line)
+        self.code.append(byte)
+
+    def add_constant(self, value: object) -> int:
+        # Keyed on the type too, since True == 1.0 as far as a dict is concerned.
+        key: tuple[type, object] = (type(value), value)
+        try:
+            index: int | None = self.constant_indices.get(key)
+        except TypeError:
+            index = None
+            key = None
+
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            if key is not None:
+                self.constant_indices[key] = index
+        return index
+
+    def get_line(self, offset: int) -> int:
+        return self.line_numbers[bisect_right(self.line_offsets, offset) - 1]
+
+    def disassemble(self, name: str) -> str:
+        lines: list[str] = [f"== {name} =="]
+        offset: int = 0
+        while offset < len(self.code):
+            op: OpCode = OpCode(self.code[offset])
+            width: int = OPERAND_BYTES.get(op, 0)
+            operands: list[int] = list(self.code[offset + 1:offset + 1 + width])
+            text: str = f"{offset:04d} {self.get_line(offset):4d} {op.name:<16}"
+
+            if op in (OpCode.GET_ENCLOSING, OpCode.SET_ENCLOSING):
+                text += f" {operands[0]} {operands[1]}"
+            elif width == 2:
+                operand: int = (operands[0] << 8) | operands[1]
+                if op in (OpCode.GET_GLOBAL, OpCode.SET_GLOBAL, OpCode.DEFINE_GLOBAL):
+                    text += f" global {operand}"
+                elif op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE):
+                    text += f" -> {offset + 3 + operand}"
+                elif op == OpCode.LOOP:
+                    text += f" -> {offset + 3 - operand}"
+                else:
+                    text += f" {operand} '{self.constants[operand]}'"
+            elif width == 1:
+                text += f" {operands[0]}"
+
+            lines.append(text)
+            offset += 1 + width
+        return "\n".join(lines)
+
+class FunctionProto:
+    # What the compiler knows about a function: the VM pairs it with the frame
+    # it was declared in to build a callable.
+
+    __slots__ = ("name", "arity", "chunk")
+
+    def __init__(self, name: str, arity: int, chunk: Chunk) -> None:
+        self.name = name
+        self.arity = arity
+        self.chunk = chunk
+
+    def __str__(self) -> str:
+        return f"<fn {self.name}>"
@@ -0,0 +1,499 @@
+import expr
+import stmt
+import operator
+from typing import Callable
+from token import TokenType, Token
+from __init__ import Pylox
+import runtimeerror
+from completion import RETURN
+from environment import Environment, UNDEFINED
+import loxcallable
+from natives import Native, NativeError
+from loxarray import LoxArray
+
+# Every compiled node is a plain Python function taking the environment it runs
+# in. Expressions return their value, statements return RETURN when a return
+# statement ran and anything else otherwise.
+Compiled = Callable[[Environment], object]
+
+NUMERIC_OPERATORS = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.SLASH: operator.truediv,
+    TokenType.STAR: operator.mul,
+}
+
+class CompiledFunction(loxcallable.LoxCallable):
+
+    def __init__(self, declaration: stmt.Function, body: Compiled, closure: Environment) -> None:
+        self.declaration = declaration
+        self.body = body
+        self.closure = closure
+        self.param_count: int = len(declaration.params)
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
+        function: CompiledFunction = self
+        while True:
+            if function.body(Environment(function.closure, arguments)) is not RETURN:
+                return None
+            if interpreter.tail_call is None:
+                return interpreter.return_value
+
+            function, arguments = interpreter.tail_call
+            interpreter.tail_call = None
+
+    def __str__(self):
+        return f"<fn {self.declaration.name.lexeme}>"
+
+class ClosureCompiler(expr.Visitor, stmt.Visitor):
+    """
+    Walks a resolved tree once and turns every node into a Python closure, so
+    running the program no longer pays for accept() dispatch or for matching
+    on the operator token of every binary expression.
+    """
+
+    def __init__(self, interpreter: 'Interpreter') -> None:
+        self.interpreter = interpreter
+        self.globals = interpreter.globals
+        self.locals = interpreter.locals
+        # Declarations outside of any block or function go into the globals by
+        # name, everything else is appended to the slots of its frame.
+        self.scope_depth = 0
+
+    def compile(self, node: stmt.Stmt | expr.Expr) -> Compiled:
+        return node.accept(self)
+
+    def compile_statements(self, statements: list[stmt.Stmt]) -> Compiled:
+        compiled: tuple[Compiled, ...] = tuple(self.compile(statement) for statement in statements)
+
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def run(environment: Environment) -> object:
+            for statement in compiled:
+                if statement(environment) is RETURN:
+                    return RETURN
+            return None
+        return run
+
+    def interpret(self, statements: list[stmt.Stmt]) -> None:
+        try:
+            program: Compiled = self.compile_statements(statements)
+            program(self.globals)
+        except runtimeerror.RuntimeError as error:
+            Pylox.runtime_error(error)
+
+    def compile_scope(self, statements: list[stmt.Stmt]) -> Compiled:
+        self.scope_depth += 1
+        try:
+            return self.compile_statements(statements)
+        finally:
+            self.scope_depth -= 1
+
+    def compile_define(self, name: str, value: Compiled) -> Compiled:
+        if self.scope_depth == 0:
+            slots: list[object] = self.globals.slots
+            slot: int = self.globals.slot(name)
+
+            def define_global(environment: Environment) -> None:
+                slots[slot] = value(environment)
+            return define_global
+
+        def define_local(environment: Environment) -> None:
+            environment.slots.append(value(environment))
+        return define_local
+
+    def visit_block_stmt(self, statement: stmt.Block) -> Compiled:
+        body: Compiled = self.compile_scope(statement.statements)
+
+        def block(environment: Environment) -> object:
+            return body(Environment(environment))
+        return block
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> Compiled:
+        # The value is simply dropped by whoever runs the statement.
+        return self.compile(statement.expression)
+
+    def visit_function_stmt(self, statement: stmt.Function) -> Compiled:
+        body: Compiled = self.compile_scope(statement.body)
+        return self.compile_define(statement.name.lexeme, lambda environment: CompiledFunction(statement, body, environment))
+
+    def visit_if_stmt(self, statement: stmt.If) -> Compiled:
+        condition: Compiled = self.compile(statement.condition)
+        then_branch: Compiled = self.compile(statement.then_branch)
+
+        if statement.else_branch is None:
+            def if_then(environment: Environment) -> object:
+                value: object = condition(environment)
+                if value is not None and value is not False:
+                    return then_branch(environment)
+                return None
+            return if_then
+
+        else_branch: Compiled = self.compile(statement.else_branch)
+
+        def if_then_else(environment: Environment) -> object:
+            value: object = condition(environment)
+            if value is not None and value is not False:
+                return then_branch(environment)
+            return else_branch(environment)
+        return if_then_else
+
+    def visit_print_stmt(self, statement: stmt.Print) -> Compiled:
+        expression: Compiled = self.compile(statement.expression)
+        stringify = self.interpreter.stringify
+        write = self.interpreter.output.write
+
+        def print_(environment: Environment) -> None:
+            write(stringify(expression(environment)) + "\n")
+        return print_
+
+    def visit_return_stmt(self, statement: stmt.Return) -> Compiled:
+        interpreter: 'Interpreter' = self.interpreter
+
+        if statement.value is None:
+            def return_nil(environment: Environment) -> object:
+                interpreter.return_value = None
+                return RETURN
+            return return_nil
+
+        value: Compiled = self.compile(statement.value)
+
+        declaration: stmt.Function | None = interpreter.tail_calls.get(statement)
+        if declaration is not None:
+            return self.compile_tail_call(statement.value, declaration, value)
+
+        def return_(environment: Environment) -> object:
+            interpreter.return_value = value(environment)
+            return RETURN
+        return return_
+
+    def compile_tail_call(self, call: expr.Call, declaration: stmt.Function, value: Compiled) -> Compiled:
+        # See Interpreter.visit_return_stmt(): the callee and arguments are
+        # handed to the call waiting on this one, which loops.
+        interpreter: 'Interpreter' = self.interpreter
+        callee: Compiled = self.compile(call.callee)
+        arguments: tuple[Compiled, ...] = tuple(self.compile(argument) for argument in call.arguments)
+        paren: Token = call.paren
+
+        def tail_call(environment: Environment) -> object:
+            function: object = callee(environment)
+            if type(function) is not CompiledFunction or function.declaration is not declaration:
+                interpreter.return_value = value(environment)
+                return RETURN
+
+            values: list[object] = [argument(environment) for argument in arguments]
+            if len(values) != function.param_count:
+                raise runtimeerror.RuntimeError(paren, f"Expected {function.param_count} arguments but got {len(values)}")
+            interpreter.tail_call = (function, values)
+            return RETURN
+        return tail_call
+
+    def visit_var_stmt(self, statement: stmt.Var) -> Compiled:
+        if statement.initializer is None:
+            return self.compile_define(statement.name.lexeme, lambda environment: None)
+
+        return self.compile_define(statement.name.lexeme, self.compile(statement.initializer))
+
+    def visit_while_stmt(self, statement: stmt.While) -> Compiled:
+        condition: Compiled = self.compile(statement.condition)
+        body: Compiled = self.compile(statement.body)
+
+        def while_(environment: Environment) -> object:
+            while True:
+                value: object = condition(environment)
+                if value is None or value is False:
+                    return None
+                if body(environment) is RETURN:
+                    return RETURN
+        return while_
+
+    def visit_assign_expr(self, expression: expr.Assign) -> Compiled:
+        value: Compiled = self.compile(expression.value)
+        name: Token = expression.name
+        location: tuple[int, int] = self.locals.get(expression, None)
+
+        if location is None:
+            # Globals are bound to their slot right here, once.
+            slots: list[object] = self.globals.slots
+            slot: int = self.globals.slot(name.lexeme)
+
+            def assign(environment: Environment) -> object:
+                result: object = value(environment)
+                if slots[slot] is UNDEFINED:
+                    raise runtimeerror.RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+                slots[slot] = result
+                return result
+            return assign
+
+        distance, slot = location
+
+        if distance == 0:
+            def assign_local(environment: Environment) -> object:
+                result: object = value(environment)
+                environment.slots[slot] = result
+                return result
+            return assign_local
+
+        def assign_enclosing(environment: Environment) -> object:
+            result: object = value(environment)
+            environment.ancestor(distance).slots[slot] = result
+            return result
+        return assign_enclosing
+
+    def visit_binary_expr(self, expression: expr.Binary) -> Compiled:
+        token: Token = expression.operator
+        tokentype: TokenType = token.tokentype
+
+        if tokentype in NUMERIC_OPERATORS:
+            specialized: Compiled = self.specialize_numeric(expression)
+            if specialized is not None:
+                return specialized
+
+        left: Compiled = self.compile(expression.left)
+        right: Compiled = self.compile(expression.right)
+        is_equal = self.interpreter.is_equal
+
+        match tokentype:
+            case TokenType.PLUS:
+                def add(environment: Environment) -> object:
+                    a: object = left(environment)
+                    b: object = right(environment)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a + b
+                    if isinstance(a, str) and isinstance(b, str):
+                        return a + b
+                    raise runtimeerror.RuntimeError(token, "Operands must be two numbers or two strings.")
+                return add
+            case TokenType.BANG_EQUAL:
+                return lambda environment: not is_equal(left(environment), right(environment))
+            case TokenType.EQUAL_EQUAL:
+                return lambda environment: is_equal(left(environment), right(environment))
+
+        op = NUMERIC_OPERATORS[tokentype]
+
+        def numeric(environment: Environment) -> object:
+            a: object = left(environment)
+            b: object = right(environment)
+            if isinstance(a, float) and isinstance(b, float):
+                # Only division can raise, and costs the others nothing.
+                try:
+                    return op(a, b)
+                except ZeroDivisionError:
+                    raise runtimeerror.RuntimeError(token, "Division by zero.") from None
+            raise runtimeerror.RuntimeError(token, "Operands must be numbers.")
+        return numeric
+
+    def specialize_numeric(self, expression: expr.Binary) -> Compiled | None:
+        # Hot loops are mostly `i < n`, `n - 1` and friends, so a numeric operator
+        # whose left operand is a local of the innermost scope and whose right
+        # operand is another such local or a number literal reads both operands
+        # inline instead of calling out to a closure per side.
+        left: expr.Expr = expression.left
+        right: expr.Expr = expression.right
+        a_location: tuple[int, int] = self.locals.get(left, None)
+        if a_location is None or a_location[0] != 0:
+            return None
+
+        token: Token = expression.operator
+        op = NUMERIC_OPERATORS[token.tokentype]
+        a_slot: int = a_location[1]
+        b_location: tuple[int, int] = self.locals.get(right, None)
+
+        if b_location is not None and b_location[0] == 0:
+            b_slot: int = b_location[1]
+
+            def local_local(environment: Environment) -> object:
+                slots: list[object] = environment.slots
+                a: object = slots[a_slot]
+                b: object = slots[b_slot]
+                if isinstance(a, float) and isinstance(b, float):
+                    try:
+                        return op(a, b)
+                    except ZeroDivisionError:
+                        raise runtimeerror.RuntimeError(token, "Division by zero.") from None
+                raise runtimeerror.RuntimeError(token, "Operands must be numbers.")
+            return local_local
+
+        if isinstance(right, expr.Literal) and isinstance(right.value, float):
+            b: float = right.value
+
+            def local_constant(environment: Environment) -> object:
+                a: object = environment.slots[a_slot]
+                if isinstance(a, float):
+                    try:
+                        return op(a, b)
+                    except ZeroDivisionError:
+                        raise runtimeerror.RuntimeError(token, "Division by zero.") from None
+                raise runtimeerror.RuntimeError(token, "Operands must be numbers.")
+            return local_constant
+
+        return None
+
+    def visit_call_expr(self, expression: expr.Call) -> Compiled:
+        callee: Compiled = self.compile(expression.callee)
+        arguments: tuple[Compiled, ...] = tuple(self.compile(argument) for argument in expression.arguments)
+        paren: Token = expression.paren
+        interpreter: 'Interpreter' = self.interpreter
+
+        def call(environment: Environment) -> object:
+            function: object = callee(environment)
+            values: list[object] = [argument(environment) for argument in arguments]
+
+            if type(function) is CompiledFunction:
+                # Same as CompiledFunction.call(), minus that frame, the ABC
+                # check and arity().
+                if len(values) != function.param_count:
+                    raise runtimeerror.RuntimeError(paren, f"Expected {function.param_count} arguments but got {len(values)}")
+                try:
+                    while function.body(Environment(function.closure, values)) is RETURN:
+                        if interpreter.tail_call is None:
+                            return interpreter.return_value
+                        function, values = interpreter.tail_call
+                        interpreter.tail_call = None
+                except RecursionError:
+                    raise runtimeerror.RuntimeError(paren, "Stack overflow.") from None
+                return None
+
+            if type(function) is Native:
+                if len(values) != function.param_count:
+                    raise runtimeerror.RuntimeError(paren, f"Expected {function.param_count} arguments but got {len(values)}")
+                try:
+                    return function.function(*values)
+                except NativeError as error:
+                    raise runtimeerror.RuntimeError(paren, error.message) from None
+
+            if not isinstance(function, loxcallable.LoxCallable):
+                raise runtimeerror.RuntimeError(paren, "Can only call functions and classes.")
+
+            if len(values) != function.arity():
+                raise runtimeerror.RuntimeError(paren, f"Expected {function.arity()} arguments but got {len(values)}")
+            try:
+                return function.call(interpreter, values)
+            except NativeError as error:
+                raise runtimeerror.RuntimeError(paren, error.message) from None
+            except RecursionError:
+                raise runtimeerror.RuntimeError(paren, "Stack overflow.") from None
+        return call
+
+    def visit_array_expr(self, expression: expr.Array) -> Compiled:
+        elements: tuple[Compiled, ...] = tuple(self.compile(element) for element in expression.elements)
+        of = LoxArray.of
+        return lambda environment: of([element(environment) for element in elements])
+
+    def visit_index_expr(self, expression: expr.Index) -> Compiled:
+        sequence: Compiled = self.compile(expression.sequence)
+        index: Compiled = self.compile(expression.index)
+        bracket: Token = expression.bracket
+        checked_index = self.interpreter.index
+
+        def index_(environment: Environment) -> object:
+            container: object = sequence(environment)
+            position: object = index(environment)
+            # An array read at a whole number in range skips the checks and
+            # error messages of Interpreter.index().
+            if type(container) is LoxArray and type(position) is float:
+                elements = container.elements
+                slot: int = int(position)
+                if slot == position and 0 <= slot < len(elements):
+                    return elements[slot]
+            return checked_index(bracket, container, position)
+        return index_
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> Compiled:
+        sequence: Compiled = self.compile(expression.sequence)
+        index: Compiled = self.compile(expression.index)
+        value: Compiled = self.compile(expression.value)
+        bracket: Token = expression.bracket
+        set_index = self.interpreter.set_index
+
+        def set_index_(environment: Environment) -> object:
+            container: object = sequence(environment)
+            position: object = index(environment)
+            result: object = value(environment)
+            if type(container) is LoxArray and type(position) is float:
+                elements = container.elements
+                slot: int = int(position)
+                if slot == position and 0 <= slot < len(elements):
+                    if type(result) is float or type(elements) is list:
+                        elements[slot] = result
+                    else:
+                        container.set(slot, result)
+                    return result
+            return set_index(bracket, container, position, result)
+        return set_index_
+
+    def visit_grouping_expr(self, expression: expr.Grouping) -> Compiled:
+        # Groupings only matter to the parser, so they compile away entirely.
+        return self.compile(expression.expression)
+
+    def visit_literal_expr(self, expression: expr.Literal) -> Compiled:
+        value: object = expression.value
+        return lambda environment: value
+
+    def visit_logical_expr(self, expression: expr.Logical) -> Compiled:
+        left: Compiled = self.compile(expression.left)
+        right: Compiled = self.compile(expression.right)
+
+        if expression.operator.tokentype == TokenType.OR:
+            def or_(environment: Environment) -> object:
+                value: object = left(environment)
+                if value is not None and value is not False:
+                    return value
+                return right(environment)
+            return or_
+
+        def and_(environment: Environment) -> object:
+            value: object = left(environment)
+            if value is None or value is False:
+                return value
+            return right(environment)
+        return and_
+
+    def visit_unary_expr(self, expression: expr.Unary) -> Compiled:
+        right: Compiled = self.compile(expression.right)
+        token: Token = expression.operator
+
+        if token.tokentype == TokenType.BANG:
+            def not_(environment: Environment) -> object:
+                value: object = right(environment)
+                return value is None or value is False
+            return not_
+
+        def negate(environment: Environment) -> object:
+            value: object = right(environment)
+            if isinstance(value, float):
+                return -value
+            raise runtimeerror.RuntimeError(token, "Operand must be a number.")
+        return negate
+
+    def visit_variable_expr(self, expression: expr.Variable) -> Compiled:
+        name: Token = expression.name
+        location: tuple[int, int] = self.locals.get(expression, None)
+
+        if location is None:
+            slots: list[object] = self.globals.slots
+            slot: int = self.globals.slot(name.lexeme)
+
+            def get_global(environment: Environment) -> object:
+                value: object = slots[slot]
+                if value is UNDEFINED:
+                    raise runtimeerror.RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+                return value
+            return get_global
+
+        distance, slot = location
+
+        if distance == 0:
+            return lambda environment: environment.slots[slot]
+
+        if distance == 1:
+            return lambda environment: environment.enclosing.slots[slot]
+
+        return lambda environment: environment.ancestor(distance).slots[slot]
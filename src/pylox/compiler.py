@@ -0,0 +1,275 @@
+import expr
+import stmt
+from token import TokenType, Token
+from __init__ import Pylox
+from chunk import Chunk, FunctionProto, OpCode
+
+BINARY_OPCODES = {
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.STAR: OpCode.MULTIPLY,
+}
+
+UINT8_MAX = 0xFF
+UINT16_MAX = 0xFFFF
+
+class Compiler(expr.Visitor, stmt.Visitor):
+    """
+    Lowers a resolved statement list to bytecode for the VM. Variable
+    references use the (depth, slot) pairs the Resolver left on the
+    interpreter, so frames are laid out exactly like the tree-walker's.
+    """
+
+    def __init__(self, interpreter: 'Interpreter') -> None:
+        self.locals = interpreter.locals
+        # Globals are compiled to their slot in the interpreter's globals
+        # rather than their name, so the VM never hashes a name at runtime.
+        self.globals = interpreter.globals
+        self.chunk: Chunk = Chunk()
+        self.scope_depth: int = 0
+        self.line: int = 1
+
+    def compile(self, statements: list[stmt.Stmt]) -> FunctionProto:
+        for statement in statements:
+            statement.accept(self)
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        return FunctionProto("script", 0, self.chunk)
+
+    def emit(self, *data: int) -> None:
+        for byte in data:
+            self.chunk.write(byte, self.line)
+
+    def emit_short(self, op: OpCode, operand: int) -> None:
+        if operand > UINT16_MAX:
+            Pylox.error(self.line, "Too many constants or globals in one chunk.")
+            operand = 0
+        self.emit(op, operand >> 8, operand & 0xFF)
+
+    def emit_constant(self, value: object) -> None:
+        self.emit_short(OpCode.CONSTANT, self.chunk.add_constant(value))
+
+    def emit_jump(self, op: OpCode) -> int:
+        self.emit(op, 0xFF, 0xFF)
+        return len(self.chunk.code) - 2
+
+    def patch_jump(self, offset: int) -> None:
+        jump: int = len(self.chunk.code) - offset - 2
+        if jump > UINT16_MAX:
+            Pylox.error(self.line, "Too much code to jump over.")
+        self.chunk.code[offset] = (jump >> 8) & 0xFF
+        self.chunk.code[offset + 1] = jump & 0xFF
+
+    def emit_loop(self, loop_start: int) -> None:
+        offset: int = len(self.chunk.code) - loop_start + 3
+        if offset > UINT16_MAX:
+            Pylox.error(self.line, "Loop body too large.")
+        self.emit(OpCode.LOOP, (offset >> 8) & 0xFF, offset & 0xFF)
+
+    def emit_variable(self, expression: expr.Expr, name: Token, local_op: OpCode, enclosing_op: OpCode, global_op: OpCode) -> None:
+        location: tuple[int, int] = self.locals.get(expression, None)
+
+        if location is None:
+            self.emit_short(global_op, self.globals.slot(name.lexeme))
+            return None
+
+        depth, slot = location
+        if depth > UINT8_MAX or slot > UINT8_MAX:
+            Pylox.error(name, "Too many nested scopes or local variables.")
+            return None
+
+        if depth == 0:
+            self.emit(local_op, slot)
+        else:
+            self.emit(enclosing_op, depth, slot)
+
+    def define(self, name: Token) -> None:
+        if self.scope_depth == 0:
+            self.emit_short(OpCode.DEFINE_GLOBAL, self.globals.slot(name.lexeme))
+        else:
+            self.emit(OpCode.DEFINE_LOCAL)
+
+    def visit_block_stmt(self, statement: stmt.Block) -> None:
+        self.emit(OpCode.PUSH_SCOPE)
+        self.scope_depth += 1
+        for inner in statement.statements:
+            inner.accept(self)
+        self.scope_depth -= 1
+        self.emit(OpCode.POP_SCOPE)
+        return None
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> None:
+        statement.expression.accept(self)
+        self.emit(OpCode.POP)
+        return None
+
+    def visit_function_stmt(self, statement: stmt.Function) -> None:
+        self.line = statement.name.line
+        enclosing_chunk: Chunk = self.chunk
+        enclosing_depth: int = self.scope_depth
+
+        self.chunk = Chunk()
+        self.scope_depth = enclosing_depth + 1
+        for inner in statement.body:
+            inner.accept(self)
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        function: FunctionProto = FunctionProto(statement.name.lexeme, len(statement.params), self.chunk)
+
+        self.chunk = enclosing_chunk
+        self.scope_depth = enclosing_depth
+        self.line = statement.name.line
+        self.emit_short(OpCode.CLOSURE, self.chunk.add_constant(function))
+        self.define(statement.name)
+        return None
+
+    def visit_if_stmt(self, statement: stmt.If) -> None:
+        statement.condition.accept(self)
+        then_jump: int = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        statement.then_branch.accept(self)
+
+        else_jump: int = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(then_jump)
+        self.emit(OpCode.POP)
+
+        if statement.else_branch is not None:
+            statement.else_branch.accept(self)
+        self.patch_jump(else_jump)
+        return None
+
+    def visit_print_stmt(self, statement: stmt.Print) -> None:
+        statement.expression.accept(self)
+        self.emit(OpCode.PRINT)
+        return None
+
+    def visit_return_stmt(self, statement: stmt.Return) -> None:
+        self.line = statement.keyword.line
+        if statement.value is None:
+            self.emit(OpCode.NIL)
+        else:
+            statement.value.accept(self)
+        self.emit(OpCode.RETURN)
+        return None
+
+    def visit_var_stmt(self, statement: stmt.Var) -> None:
+        self.line = statement.name.line
+        if statement.initializer is None:
+            self.emit(OpCode.NIL)
+        else:
+            statement.initializer.accept(self)
+        self.define(statement.name)
+        return None
+
+    def visit_while_stmt(self, statement: stmt.While) -> None:
+        loop_start: int = len(self.chunk.code)
+        statement.condition.accept(self)
+
+        exit_jump: int = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        statement.body.accept(self)
+        self.emit_loop(loop_start)
+
+        self.patch_jump(exit_jump)
+        self.emit(OpCode.POP)
+        return None
+
+    def visit_assign_expr(self, expression: expr.Assign) -> None:
+        expression.value.accept(self)
+        self.line = expression.name.line
+        self.emit_variable(expression, expression.name, OpCode.SET_LOCAL, OpCode.SET_ENCLOSING, OpCode.SET_GLOBAL)
+        return None
+
+    def visit_binary_expr(self, expression: expr.Binary) -> None:
+        expression.left.accept(self)
+        expression.right.accept(self)
+        self.line = expression.operator.line
+        self.emit(BINARY_OPCODES[expression.operator.tokentype])
+        return None
+
+    def visit_call_expr(self, expression: expr.Call) -> None:
+        expression.callee.accept(self)
+        for argument in expression.arguments:
+            argument.accept(self)
+        self.line = expression.paren.line
+        self.emit(OpCode.CALL, len(expression.arguments))
+        return None
+
+    def visit_array_expr(self, expression: expr.Array) -> None:
+        for element in expression.elements:
+            element.accept(self)
+        self.line = expression.bracket.line
+        if len(expression.elements) > UINT16_MAX:
+            Pylox.error(self.line, "Too many elements in an array literal.")
+        self.emit(OpCode.ARRAY, (len(expression.elements) >> 8) & 0xFF, len(expression.elements) & 0xFF)
+        return None
+
+    def visit_index_expr(self, expression: expr.Index) -> None:
+        expression.sequence.accept(self)
+        expression.index.accept(self)
+        self.line = expression.bracket.line
+        self.emit(OpCode.GET_INDEX)
+        return None
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> None:
+        expression.sequence.accept(self)
+        expression.index.accept(self)
+        expression.value.accept(self)
+        self.line = expression.bracket.line
+        self.emit(OpCode.SET_INDEX)
+        return None
+
+    def visit_grouping_expr(self, expression: expr.Grouping) -> None:
+        expression.expression.accept(self)
+        return None
+
+    def visit_literal_expr(self, expression: expr.Literal) -> None:
+        match expression.value:
+            case None:
+                self.emit(OpCode.NIL)
+            case True:
+                self.emit(OpCode.TRUE)
+            case False:
+                self.emit(OpCode.FALSE)
+            case _:
+                self.emit_constant(expression.value)
+        return None
+
+    def visit_logical_expr(self, expression: expr.Logical) -> None:
+        expression.left.accept(self)
+        self.line = expression.operator.line
+
+        if expression.operator.tokentype == TokenType.OR:
+            else_jump: int = self.emit_jump(OpCode.JUMP_IF_FALSE)
+            end_jump: int = self.emit_jump(OpCode.JUMP)
+            self.patch_jump(else_jump)
+            self.emit(OpCode.POP)
+            expression.right.accept(self)
+            self.patch_jump(end_jump)
+        else:
+            end_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+            self.emit(OpCode.POP)
+            expression.right.accept(self)
+            self.patch_jump(end_jump)
+        return None
+
+    def visit_unary_expr(self, expression: expr.Unary) -> None:
+        expression.right.accept(self)
+        self.line = expression.operator.line
+        if expression.operator.tokentype == TokenType.BANG:
+            self.emit(OpCode.NOT)
+        else:
+            self.emit(OpCode.NEGATE)
+        return None
+
+    def visit_variable_expr(self, expression: expr.Variable) -> None:
+        self.line = expression.name.line
+        self.emit_variable(expression, expression.name, OpCode.GET_LOCAL, OpCode.GET_ENCLOSING, OpCode.GET_GLOBAL)
+        return None
@@ -0,0 +1,10 @@
+class Return:
+    # Statements complete normally by evaluating to None. A return statement
+    # instead leaves its value on the interpreter and evaluates to RETURN,
+    # which every enclosing statement hands straight back up until it reaches
+    # the call waiting for it, so returning never has to raise and unwind.
+
+    def __repr__(self) -> str:
+        return "RETURN"
+
+RETURN = Return()
@@ -0,0 +1,24 @@
+import expr
+import stmt
+from functools import partial
+from typing import Callable
+
+# Every node class tool.py generated from grammar.GRAMMAR.
+NODES: tuple[type, ...] = (*expr.KINDS, *stmt.KINDS)
+
+Handler = Callable[[expr.Expr | stmt.Stmt], object]
+
+def dispatch_table(visitor: expr.Visitor | stmt.Visitor, table: bool = True) -> dict[type, Handler]:
+    # Maps each node class the visitor has a visit method for to a handler
+    # taking the node, so visitors dispatch with handlers[type(node)](node).
+    #
+    # With table set, the handler is the visit method itself, bound once here,
+    # which saves the call to node.accept() and its getattr of the visit method
+    # on every node. Otherwise it is node.accept with the visitor filled in, so
+    # each visit still goes through the book's double dispatch.
+    nodes: list[type] = [node for node in NODES if hasattr(visitor, node.VISIT)]
+
+    if table:
+        return {node: getattr(visitor, node.VISIT) for node in nodes}
+
+    return {node: partial(node.accept, visitor=visitor) for node in nodes}
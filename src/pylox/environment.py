@@ -1,41 +1,69 @@
 from token import Token
 import runtimeerror
 
+class Undefined:
+    # Fills a global slot that was handed out for a name before anything
+    # defined it.
+
+    def __repr__(self) -> str:
+        return "UNDEFINED"
+
+UNDEFINED = Undefined()
+
 class Environment():
 
-    def __init__(self, enclosing: 'Environment' = None) -> None:
+    __slots__ = ("enclosing", "names", "slots")
+
+    def __init__(self, enclosing: 'Environment' = None, slots: list[object] = None) -> None:
         self.enclosing = enclosing
-        self.values = {}
+        # Only the global scope is looked up by name. Every other scope is a
+        # frame whose variables live at the slot the resolver gave them.
+        # Globals live in slots too, and names maps each of them to its slot,
+        # which never changes once handed out, so code that has looked a
+        # global up once can keep using the slot instead of the name.
+        self.names = {} if enclosing is None else None
+        self.slots = [] if slots is None else slots
 
     def define(self, name: str, value: object) -> None:
-        self.values[name] = value
-    
+        self.slots[self.slot(name)] = value
+
+    def slot(self, name: str) -> int:
+        index: int | None = self.names.get(name)
+        if index is None:
+            index = self.names[name] = len(self.slots)
+            self.slots.append(UNDEFINED)
+        return index
+
     def get(self, name: Token) -> object:
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
+        if self.names is not None:
+            index: int | None = self.names.get(name.lexeme)
+            if index is not None and self.slots[index] is not UNDEFINED:
+                return self.slots[index]
         
         if self.enclosing:
             return self.enclosing.get(name)
 
         raise runtimeerror.RuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
     
-    def get_at(self, distance: int, name: str) -> None:
-        return self.ancestor(distance).values[name]
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance).slots[slot]
     
-    def assign_at(self, distance: int, name: str, value: object) -> None:
-        self.ancestor.values[name] = value
+    def assign_at(self, distance: int, slot: int, value: object) -> None:
+        self.ancestor(distance).slots[slot] = value
     
     def ancestor(self, distance: int) -> 'Environment':
         environment: 'Environment' = self
         for i in range(distance):
-            environment = environment.closing
+            environment = environment.enclosing
         return environment
 
     
     def assign(self, name: Token, value: object) -> None:
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-            return None
+        if self.names is not None:
+            index: int | None = self.names.get(name.lexeme)
+            if index is not None and self.slots[index] is not UNDEFINED:
+                self.slots[index] = value
+                return None
         
         if self.enclosing:
             self.enclosing.assign(name, value)
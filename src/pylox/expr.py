@@ -3,84 +3,217 @@ from token import Token
 
 class Expr(ABC):
 
+    # Fields are set once, by __init__, and never change afterwards.
+    __slots__ = ()
+
+    # Position of the node class in KINDS and the name of its Visitor method.
+    KIND: int
+    VISIT: str
+
     @abstractmethod
     def accept(self, visitor: 'Visitor') -> None:
         raise NotImplementedError
 
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __reduce__(self) -> tuple:
+        # Pickle would restore the slots with setattr, so go through __init__.
+        return (type(self), tuple(getattr(self, field) for field in self.__slots__))
+
+class Array(Expr):
+
+    __slots__ = ('bracket', 'elements')
+    KIND = 0
+    VISIT = "visit_array_expr"
+
+    bracket: Token
+    elements: 'list[Expr]'
+
+    def __init__(self, bracket: Token, elements: 'list[Expr]') -> None:
+        object.__setattr__(self, "bracket", bracket)
+        object.__setattr__(self, "elements", elements)
+
+    def accept(self, visitor: 'Visitor') -> None:
+        return visitor.visit_array_expr(self)
+
 class Assign(Expr):
 
+    __slots__ = ('name', 'value')
+    KIND = 1
+    VISIT = "visit_assign_expr"
+
+    name: Token
+    value: 'Expr'
+
     def __init__(self, name: Token, value: 'Expr') -> None:
-        self.name: Token = name
-        self.value: 'Expr' = value
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "value", value)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_assign_expr(self)
 
 class Binary(Expr):
 
+    __slots__ = ('left', 'operator', 'right')
+    KIND = 2
+    VISIT = "visit_binary_expr"
+
+    left: 'Expr'
+    operator: Token
+    right: 'Expr'
+
     def __init__(self, left: 'Expr', operator: Token, right: 'Expr') -> None:
-        self.left: 'Expr' = left
-        self.operator: Token = operator
-        self.right: 'Expr' = right
+        object.__setattr__(self, "left", left)
+        object.__setattr__(self, "operator", operator)
+        object.__setattr__(self, "right", right)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_binary_expr(self)
 
 class Call(Expr):
 
+    __slots__ = ('callee', 'paren', 'arguments')
+    KIND = 3
+    VISIT = "visit_call_expr"
+
+    callee: 'Expr'
+    paren: Token
+    arguments: 'list[Expr]'
+
     def __init__(self, callee: 'Expr', paren: Token, arguments: 'list[Expr]') -> None:
-        self.callee: 'Expr' = callee
-        self.paren: Token = paren
-        self.arguments: 'list[Expr]' = arguments
+        object.__setattr__(self, "callee", callee)
+        object.__setattr__(self, "paren", paren)
+        object.__setattr__(self, "arguments", arguments)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_call_expr(self)
 
 class Grouping(Expr):
 
+    __slots__ = ('expression',)
+    KIND = 4
+    VISIT = "visit_grouping_expr"
+
+    expression: 'Expr'
+
     def __init__(self, expression: 'Expr') -> None:
-        self.expression: 'Expr' = expression
+        object.__setattr__(self, "expression", expression)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_grouping_expr(self)
 
+class Index(Expr):
+
+    __slots__ = ('sequence', 'bracket', 'index')
+    KIND = 5
+    VISIT = "visit_index_expr"
+
+    sequence: 'Expr'
+    bracket: Token
+    index: 'Expr'
+
+    def __init__(self, sequence: 'Expr', bracket: Token, index: 'Expr') -> None:
+        object.__setattr__(self, "sequence", sequence)
+        object.__setattr__(self, "bracket", bracket)
+        object.__setattr__(self, "index", index)
+
+    def accept(self, visitor: 'Visitor') -> None:
+        return visitor.visit_index_expr(self)
+
 class Literal(Expr):
 
+    __slots__ = ('value',)
+    KIND = 6
+    VISIT = "visit_literal_expr"
+
+    value: object
+
     def __init__(self, value: object) -> None:
-        self.value: object = value
+        object.__setattr__(self, "value", value)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_literal_expr(self)
 
 class Logical(Expr):
 
+    __slots__ = ('left', 'operator', 'right')
+    KIND = 7
+    VISIT = "visit_logical_expr"
+
+    left: 'Expr'
+    operator: Token
+    right: 'Expr'
+
     def __init__(self, left: 'Expr', operator: Token, right: 'Expr') -> None:
-        self.left: 'Expr' = left
-        self.operator: Token = operator
-        self.right: 'Expr' = right
+        object.__setattr__(self, "left", left)
+        object.__setattr__(self, "operator", operator)
+        object.__setattr__(self, "right", right)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_logical_expr(self)
 
+class SetIndex(Expr):
+
+    __slots__ = ('sequence', 'bracket', 'index', 'value')
+    KIND = 8
+    VISIT = "visit_setindex_expr"
+
+    sequence: 'Expr'
+    bracket: Token
+    index: 'Expr'
+    value: 'Expr'
+
+    def __init__(self, sequence: 'Expr', bracket: Token, index: 'Expr', value: 'Expr') -> None:
+        object.__setattr__(self, "sequence", sequence)
+        object.__setattr__(self, "bracket", bracket)
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "value", value)
+
+    def accept(self, visitor: 'Visitor') -> None:
+        return visitor.visit_setindex_expr(self)
+
 class Unary(Expr):
 
+    __slots__ = ('operator', 'right')
+    KIND = 9
+    VISIT = "visit_unary_expr"
+
+    operator: Token
+    right: 'Expr'
+
     def __init__(self, operator: Token, right: 'Expr') -> None:
-        self.operator: Token = operator
-        self.right: 'Expr' = right
+        object.__setattr__(self, "operator", operator)
+        object.__setattr__(self, "right", right)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_unary_expr(self)
 
 class Variable(Expr):
 
+    __slots__ = ('name',)
+    KIND = 10
+    VISIT = "visit_variable_expr"
+
+    name: Token
+
     def __init__(self, name: Token) -> None:
-        self.name: Token = name
+        object.__setattr__(self, "name", name)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_variable_expr(self)
 
+KINDS: tuple[type[Expr], ...] = (Array, Assign, Binary, Call, Grouping, Index, Literal, Logical, SetIndex, Unary, Variable)
+
 class Visitor(ABC):
 
+    @abstractmethod
+    def visit_array_expr(self, expr: 'Array') -> None:
+        raise NotImplementedError
+
     @abstractmethod
     def visit_assign_expr(self, expr: 'Assign') -> None:
         raise NotImplementedError
@@ -97,6 +230,10 @@ class Visitor(ABC):
     def visit_grouping_expr(self, expr: 'Grouping') -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    def visit_index_expr(self, expr: 'Index') -> None:
+        raise NotImplementedError
+
     @abstractmethod
     def visit_literal_expr(self, expr: 'Literal') -> None:
         raise NotImplementedError
@@ -105,6 +242,10 @@ class Visitor(ABC):
     def visit_logical_expr(self, expr: 'Logical') -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    def visit_setindex_expr(self, expr: 'SetIndex') -> None:
+        raise NotImplementedError
+
     @abstractmethod
     def visit_unary_expr(self, expr: 'Unary') -> None:
         raise NotImplementedError
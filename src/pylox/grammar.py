@@ -8,12 +8,15 @@ You either die a hero, or live long enough to see yourself write lisp. - Harvey
 
 GRAMMAR = (
     ("Expr", (
+        ("Array", ("bracket", "Token"), ("elements", "list[Expr]")),
         ("Assign", ("name", "Token"), ("value", "Expr")),
         ("Binary", ("left", "Expr"), ("operator", "Token"), ("right", "Expr")),
         ("Call", ("callee", "Expr"), ("paren", "Token"), ("arguments", "list[Expr]")),
         ("Grouping", ("expression", "Expr")),
+        ("Index", ("sequence", "Expr"), ("bracket", "Token"), ("index", "Expr")),
         ("Literal", ("value", "object")),
         ("Logical", ("left", "Expr"), ("operator", "Token"), ("right", "Expr")),
+        ("SetIndex", ("sequence", "Expr"), ("bracket", "Token"), ("index", "Expr"), ("value", "Expr")),
         ("Unary", ("operator", "Token"), ("right", "Expr")),
         ("Variable", ("name", "Token"))
     )),
@@ -21,10 +24,10 @@ GRAMMAR = (
         ("Block", ("statements", "list[Stmt]")),
         ("Expression", ("expression", "Expr")),
         ("Function", ("name", "Token"), ("params", "list[Token]"), ("body", "list[Stmt]")),
-        ("If", ("condition", "Expr"), ("then_branch", "Stmt"), ("else_branch", "Stmt")),
-        ("Print", ("expression", "Expr")),
+        ("If", ("keyword", "Token"), ("condition", "Expr"), ("then_branch", "Stmt"), ("else_branch", "Stmt")),
+        ("Print", ("keyword", "Token"), ("expression", "Expr")),
         ("Return", ("keyword", "Token"), ("value", "Expr")),
         ("Var", ("name", "Token"), ("initializer", "Expr")),
-        ("While", ("condition", "Expr"), ("body", "Stmt"))
+        ("While", ("keyword", "Token"), ("condition", "Expr"), ("body", "Stmt"))
     ))
 )
\ No newline at end of file
@@ -3,97 +3,149 @@ import stmt
 from token import TokenType, Token
 from __init__ import Pylox
 import runtimeerror
-from returnexception import ReturnException
-from environment import Environment
+from completion import RETURN
+from environment import Environment, UNDEFINED
 import loxcallable, loxfunction
-import time
-
-class Clock(loxcallable.LoxCallable):
-
-    def arity(self) -> int:
-        return 0
-    
-    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
-        return time.time()
-    
-    def __str__(self):
-        return "<native fn>"
+import natives
+# Registers the memo natives.
+import memo
+from loxarray import LoxArray
+from dispatch import dispatch_table
+from output import BufferedOutput
 
 class Interpreter(expr.Visitor, stmt.Visitor):
 
-    def __init__(self) -> None:
+    # The class of the functions this interpreter declares, the only ones a
+    # return statement hands a tail call back to instead of calling.
+    function_class: type = loxfunction.LoxFunction
+
+    def __init__(self, dispatch: bool = True, output: 'TextIO' = None) -> None:
+        # Visit method for each node class; dispatch=False goes through
+        # node.accept() instead.
+        self.handlers = dispatch_table(self, dispatch)
+        # Where print statements write to, on every engine: by default
+        # stdout, through a buffer flushed after each program.
+        self.output = BufferedOutput() if output is None else output
         self.globals = Environment()
         self.environment = self.globals
+        # Set by a return statement for the call that is waiting on it.
+        self.return_value: object = None
+        # Resolved locals map to the (depth, slot) of their frame.
+        self.locals: dict[expr.Expr, tuple[int, int]] = {}
+        # Every other variable or assignment is a global, and caches the slot
+        # of its name in the globals the first time it runs.
+        self.global_slots: dict[expr.Expr, int] = {}
+        # Return statements the resolver found calling their own function, and
+        # that function. When one runs, it leaves the callee and arguments here
+        # instead of calling, and the call waiting on it loops.
+        self.tail_calls: dict[stmt.Return, stmt.Function] = {}
+        self.tail_call: tuple[loxcallable.LoxCallable, list[object]] | None = None
 
-        self.globals.define("clock", Clock())
+        natives.install(self.globals)
 
     def evaluate(self, expression: expr.Expr) -> object:
-        return expression.accept(self)
+        return self.handlers[type(expression)](expression)
     
-    def execute(self, statement: stmt.Stmt) -> None:
-        statement.accept(self)
+    def execute(self, statement: stmt.Stmt) -> object:
+        return self.handlers[type(statement)](statement)
+
+    def resolve(self, expression: expr.Expr, depth: int, slot: int) -> None:
+        self.locals[expression] = (depth, slot)
+
+    def resolve_tail_call(self, statement: stmt.Return, function: stmt.Function) -> None:
+        self.tail_calls[statement] = function
+
+    def define(self, name: str, value: object) -> None:
+        if self.environment is self.globals:
+            self.globals.define(name, value)
+        else:
+            self.environment.slots.append(value)
     
-    def execute_block(self, statements: list[stmt.Stmt], environment: Environment) -> None:
+    def execute_block(self, statements: list[stmt.Stmt], environment: Environment) -> object:
         previous: Environment = self.environment
+        handlers = self.handlers
         try:
             self.environment = environment
             for statement in statements:
-                self.execute(statement)
+                if handlers[type(statement)](statement) is RETURN:
+                    return RETURN
         finally:
             self.environment = previous
-    
-    def visit_block_stmt(self, statement: stmt.Block) -> None:
-        self.execute_block(statement.statements, Environment(self.environment))
         return None
     
+    def visit_block_stmt(self, statement: stmt.Block) -> object:
+        return self.execute_block(statement.statements, Environment(self.environment))
+    
     def visit_expression_stmt(self, statement: stmt.Expression) -> None:
         self.evaluate(statement.expression)
         return None
     
     def visit_function_stmt(self, statement: stmt.Function) -> None:
         function: loxfunction.LoxFunction = loxfunction.LoxFunction(statement, self.environment)
-        self.environment.define(statement.name.lexeme, function)
+        self.define(statement.name.lexeme, function)
         return None
     
-    def visit_if_stmt(self, statement: stmt.If) -> None:
+    def visit_if_stmt(self, statement: stmt.If) -> object:
         if self.is_truthy(self.evaluate(statement.condition)):
-            self.execute(statement.then_branch)
+            return self.execute(statement.then_branch)
         elif statement.else_branch is not None:
-            self.execute(statement.else_branch)
+            return self.execute(statement.else_branch)
         
         return None
     
     def visit_print_stmt(self, statement: stmt.Print) -> None:
         value: object = self.evaluate(statement.expression)
-        print(self.stringify(value))
+        self.output.write(self.stringify(value) + "\n")
         return None
     
-    def visit_return_stmt(self, statement: stmt.Return) -> None:
+    def visit_return_stmt(self, statement: stmt.Return) -> object:
+        function: stmt.Function | None = self.tail_calls.get(statement)
+        if function is not None:
+            call: expr.Call = statement.value
+            callee: object = self.evaluate(call.callee)
+            # The name could have been rebound or shadowed since, in which
+            # case this is just an ordinary call and goes through evaluate().
+            if type(callee) is self.function_class and callee.declaration is function:
+                arguments: list[object] = [self.evaluate(argument) for argument in call.arguments]
+                if len(arguments) != callee.param_count:
+                    raise runtimeerror.RuntimeError(call.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+                self.tail_call = (callee, arguments)
+                return RETURN
+
         value: object = None
         if statement.value is not None:
             value = self.evaluate(statement.value)
         
-        raise ReturnException(value)
+        self.return_value = value
+        return RETURN
     
     def visit_var_stmt(self, statement: stmt.Var) -> None:
         value: object = None
         if statement.initializer is not None:
             value = self.evaluate(statement.initializer)
         
-        self.environment.define(statement.name.lexeme, value)
+        self.define(statement.name.lexeme, value)
         return None
     
-    def visit_while_stmt(self, statement: stmt.While) -> None:
+    def visit_while_stmt(self, statement: stmt.While) -> object:
         while self.is_truthy(self.evaluate(statement.condition)):
-            self.execute(statement.body)
+            if self.execute(statement.body) is RETURN:
+                return RETURN
         return None
 
     def visit_assign_expr(self, expression: expr.Assign) -> object:
-        value: object = self.evaluate(expression.value)
-        if self.distance is not None:
-            self.environment.assign_at(distance, expression.name, value)
-        else:
-            self.globals.assign(expression.name, value)
+        return self.assign_variable(expression.name, expression, self.evaluate(expression.value))
+
+    def assign_variable(self, name: Token, expression: expr.Expr, value: object) -> object:
+        location: tuple[int, int] = self.locals.get(expression, None)
+        if location is not None:
+            self.environment.assign_at(location[0], location[1], value)
+            return value
+
+        slot: int = self.global_slot(name, expression)
+        if self.globals.slots[slot] is UNDEFINED:
+            raise runtimeerror.RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        self.globals.slots[slot] = value
         return value
     
     def visit_literal_expr(self, expression: expr.Literal) -> object:
@@ -115,11 +167,12 @@ class Interpreter(expr.Visitor, stmt.Visitor):
         return self.evaluate(expression.expression)
     
     def visit_unary_expr(self, expression: expr.Unary) -> object:
-        right: object = self.evaluate(expression.right)
-        self.check_number_operand(expression.operator, right)
+        return self.unary(expression.operator, self.evaluate(expression.right))
 
-        match expression.operator.tokentype:
+    def unary(self, operator: Token, right: object) -> object:
+        match operator.tokentype:
             case TokenType.MINUS:
+                self.check_number_operand(operator, right)
                 return -right
             case TokenType.BANG:
                 # if it's not tight
@@ -130,13 +183,28 @@ class Interpreter(expr.Visitor, stmt.Visitor):
     def visit_variable_expr(self, expression: expr.Variable) -> None:
         return self.lookup_variable(expression.name, expression)
     
-    def lookup_variable_expr(self, name: Token, expression: expr.Expr) -> None:
-        distance: int = self.locals.get(expression, None)
+    def lookup_variable(self, name: Token, expression: expr.Expr) -> None:
+        location: tuple[int, int] = self.locals.get(expression, None)
         
-        if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
-        else:
-            return self.globals.get(name)
+        if location is not None:
+            return self.environment.get_at(location[0], location[1])
+
+        value: object = self.globals.slots[self.global_slot(name, expression)]
+        if value is UNDEFINED:
+            raise runtimeerror.RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return value
+
+    def global_slot(self, name: Token, expression: expr.Expr) -> int:
+        slot: int | None = self.global_slots.get(expression)
+        if slot is None:
+            slot = self.global_slots[expression] = self.globals.slot(name.lexeme)
+        return slot
+
+    def clear_caches(self) -> None:
+        # Forgets what was cached about nodes on their first run, which would
+        # otherwise keep every node that ever ran alive. Anything still in
+        # use just caches it again.
+        self.global_slots.clear()
 
     def is_truthy(self, obj: object) -> bool:
         if obj is None:
@@ -146,34 +214,41 @@ class Interpreter(expr.Visitor, stmt.Visitor):
         return True
     
     def visit_binary_expr(self, expression: expr.Binary) -> object:
-        left: object = self.evaluate(expression.left)
-        right: object = self.evaluate(expression.right)
+        handlers = self.handlers
+        left: object = handlers[type(expression.left)](expression.left)
+        right: object = handlers[type(expression.right)](expression.right)
+        return self.binary(expression.operator, left, right)
 
-        match expression.operator.tokentype:
+    def binary(self, operator: Token, left: object, right: object) -> object:
+        match operator.tokentype:
             case TokenType.GREATER:
-                self.check_number_operands(expression.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return left > right
             case TokenType.GREATER_EQUAL:
-                self.check_number_operands(expression.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return left >= right
             case TokenType.LESS:
-                self.check_number_operands(expression.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return left < right
             case TokenType.LESS_EQUAL:
-                self.check_number_operands(expression.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return left <= right
             case TokenType.MINUS:
-                self.check_number_operands(expression.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return left - right
             case TokenType.PLUS:
                 if (isinstance(left, float) and isinstance(right, float)):
                     return left + right
                 if (isinstance(left, str) and isinstance(right, str)):
                     return left + right # Python overloads + anyway
-                raise runtimeerror.RuntimeError(expression.operator, "Operands must be two numbers or two strings.")
+                raise runtimeerror.RuntimeError(operator, "Operands must be two numbers or two strings.")
             case TokenType.SLASH:
+                self.check_number_operands(operator, left, right)
+                if right == 0.0:
+                    raise runtimeerror.RuntimeError(operator, "Division by zero.")
                 return left / right
             case TokenType.STAR:
+                self.check_number_operands(operator, left, right)
                 return left * right
             case TokenType.BANG_EQUAL:
                 return not self.is_equal(left, right)
@@ -183,11 +258,48 @@ class Interpreter(expr.Visitor, stmt.Visitor):
         return None
     
     def visit_call_expr(self, expression: expr.Call) -> object:
-        callee: object = self.evaluate(expression.callee)
+        handlers = self.handlers
+        callee: object = handlers[type(expression.callee)](expression.callee)
+        arguments: list[object] = [handlers[type(argument)](argument) for argument in expression.arguments]
+
+        if type(callee) is loxfunction.LoxFunction:
+            # Calls between Lox functions skip the ABC check, arity() and the
+            # frames of LoxFunction.call() and execute_block(): the arguments
+            # are already the first slots of the new frame, and the body runs
+            # right here.
+            if len(arguments) != callee.param_count:
+                raise runtimeerror.RuntimeError(expression.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+
+            previous: Environment = self.environment
+            try:
+                while True:
+                    self.environment = Environment(callee.closure, arguments)
+                    for statement in callee.body:
+                        if handlers[type(statement)](statement) is RETURN:
+                            break
+                    else:
+                        return None
 
-        arguments: list[object] = []
-        for argument in expression.arguments:
-            arguments.append(self.evaluate(argument))
+                    if self.tail_call is None:
+                        return self.return_value
+                    # A tail call to the same function: run its body again
+                    # with the new arguments, rather than recursing.
+                    callee, arguments = self.tail_call
+                    self.tail_call = None
+            except RecursionError:
+                # Lox calls nest as deep as Python's recursion limit lets them.
+                raise runtimeerror.RuntimeError(expression.paren, "Stack overflow.") from None
+            finally:
+                self.environment = previous
+
+        if type(callee) is natives.Native:
+            # Natives are plain Python functions of the arguments.
+            if len(arguments) != callee.param_count:
+                raise runtimeerror.RuntimeError(expression.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+            try:
+                return callee.function(*arguments)
+            except natives.NativeError as error:
+                raise runtimeerror.RuntimeError(expression.paren, error.message) from None
         
         if not isinstance(callee, loxcallable.LoxCallable):
             raise runtimeerror.RuntimeError(expression.paren, "Can only call functions and classes.")
@@ -195,8 +307,49 @@ class Interpreter(expr.Visitor, stmt.Visitor):
         function: loxcallable.LoxCallable = callee
         if len(arguments) != function.arity():
             raise runtimeerror.RuntimeError(expression.paren, f"Expected {function.arity()} arguments but got {len(arguments)}")
-        return function.call(self, arguments)
-        
+        try:
+            return function.call(self, arguments)
+        except natives.NativeError as error:
+            # A native called through some other callable, like memo's.
+            raise runtimeerror.RuntimeError(expression.paren, error.message) from None
+        except RecursionError:
+            raise runtimeerror.RuntimeError(expression.paren, "Stack overflow.") from None
+
+    def visit_array_expr(self, expression: expr.Array) -> object:
+        handlers = self.handlers
+        return LoxArray.of([handlers[type(element)](element) for element in expression.elements])
+
+    def visit_index_expr(self, expression: expr.Index) -> object:
+        return self.index(expression.bracket, self.evaluate(expression.sequence), self.evaluate(expression.index))
+
+    def index(self, bracket: Token, sequence: object, index: object) -> object:
+        # Strings can be indexed too, for their characters.
+        if type(sequence) is LoxArray:
+            elements: object = sequence.elements
+        elif type(sequence) is str:
+            elements = sequence
+        else:
+            raise runtimeerror.RuntimeError(bracket, "Can only index arrays and strings.")
+        return elements[self.check_index(bracket, elements, index)]
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> object:
+        sequence: object = self.evaluate(expression.sequence)
+        index: object = self.evaluate(expression.index)
+        return self.set_index(expression.bracket, sequence, index, self.evaluate(expression.value))
+
+    def set_index(self, bracket: Token, sequence: object, index: object, value: object) -> object:
+        if type(sequence) is not LoxArray:
+            raise runtimeerror.RuntimeError(bracket, "Can only assign to elements of arrays.")
+        sequence.set(self.check_index(bracket, sequence.elements, index), value)
+        return value
+
+    def check_index(self, bracket: Token, elements: object, index: object) -> int:
+        if type(index) is not float or not index.is_integer():
+            raise runtimeerror.RuntimeError(bracket, "Index must be a whole number.")
+        position: int = int(index)
+        if not 0 <= position < len(elements):
+            raise runtimeerror.RuntimeError(bracket, f"Index {position} is out of range for length {len(elements)}.")
+        return position
 
     def is_equal(self, a: object, b: object) -> bool:
         if a is None and b is None:
@@ -215,6 +368,10 @@ class Interpreter(expr.Visitor, stmt.Visitor):
             text: str = str(obj)
             if text.endswith(".0"):
                 text = text[:-2]
+            return text
+
+        if type(obj) is LoxArray:
+            return "[" + ", ".join([self.stringify(element) for element in obj.elements]) + "]"
 
         return str(obj)
 
@@ -231,6 +388,7 @@ class Interpreter(expr.Visitor, stmt.Visitor):
     def interpret(self, statements: list[stmt.Stmt]) -> None:
         try:
             for statement in statements:
-                self.execute(statement)
-        except RuntimeError as error:
+                if self.execute(statement) is RETURN:
+                    break
+        except runtimeerror.RuntimeError as error:
             Pylox.runtime_error(error)
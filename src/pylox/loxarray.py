@@ -0,0 +1,47 @@
+from array import array
+
+class LoxArray:
+    """
+    A mutable sequence of Lox values, shared by reference like functions
+    are: two names for one array see each other's changes, and == is
+    identity.
+
+    While every element is a number, elements is an array('d'), eight bytes
+    per number in one block instead of a pointer to a float object each, and
+    the numeric natives read it without checking element types. The first
+    element stored that isn't a number turns it into a list for good.
+    """
+
+    __slots__ = ("elements",)
+
+    def __init__(self, elements: list[object] | array) -> None:
+        self.elements = elements
+
+    @staticmethod
+    def of(values: list[object]) -> 'LoxArray':
+        # Empty arrays start out numeric too, since they mostly get filled
+        # with numbers.
+        if set(map(type, values)) <= {float}:
+            return LoxArray(array('d', values))
+        return LoxArray(values)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def generalize(self, value: object) -> list[object] | array:
+        # The storage to put value in.
+        if type(value) is not float and type(self.elements) is array:
+            self.elements = list(self.elements)
+        return self.elements
+
+    def set(self, index: int, value: object) -> None:
+        self.generalize(value)[index] = value
+
+    def append(self, value: object) -> None:
+        self.generalize(value).append(value)
+
+    def fill(self, value: object) -> None:
+        if type(value) is float:
+            self.elements = array('d', [value]) * len(self.elements)
+        else:
+            self.elements = [value] * len(self.elements)
@@ -1,28 +1,34 @@
 import loxcallable
 from environment import Environment
-from returnexception import ReturnException
+from completion import RETURN
 
 class LoxFunction(loxcallable.LoxCallable):
 
     def __init__(self, declaration: 'stmt.Function', closure: Environment = None) -> None:
         self.closure = closure
         self.declaration = declaration
+        # Read on every call by the interpreter's fast path, which doesn't go
+        # through arity() or call().
+        self.param_count: int = len(declaration.params)
+        self.body: list['stmt.Stmt'] = declaration.body
     
     def arity(self) -> int:
-        return len(self.declaration.params)
+        return self.param_count
 
     def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
-        environment: Environment = Environment(self.closure)
+        # Parameters are the first slots of the frame, in order, so the
+        # argument list can become the frame as is.
+        function: LoxFunction = self
+        while True:
+            environment: Environment = Environment(function.closure, arguments)
 
-        for param, argument in zip(self.declaration.params, arguments):
-            environment.define(param.lexeme, argument)
-        
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnException as exception:
-            return exception.value
+            if interpreter.execute_block(function.body, environment) is not RETURN:
+                return None
+            if interpreter.tail_call is None:
+                return interpreter.return_value
 
-        return None
+            function, arguments = interpreter.tail_call
+            interpreter.tail_call = None
     
     def __str__(self):
         return f"<fn {self.declaration.name.lexeme}>"
@@ -0,0 +1,65 @@
+from functools import lru_cache
+import loxcallable
+from natives import native
+from loxarray import LoxArray
+
+# Results kept per memoized function before the least recently used go.
+MAXSIZE = 1024
+
+class MemoizedFunction(loxcallable.LoxCallable):
+    # Wraps any callable, Lox or native, on any engine. Only worth it for
+    # functions whose result depends on nothing but their arguments: a
+    # cached call doesn't run the body, so it doesn't print or assign either.
+
+    def __init__(self, function: loxcallable.LoxCallable, maxsize: int = MAXSIZE) -> None:
+        self.function = function
+        self.interpreter: 'Interpreter' = None
+        # lru_cache keeps the recency order and the hit and miss counts. It
+        # is keyed on (type, value) pairs, since True == 1.0 and the two
+        # mustn't share a result.
+        self.cached = lru_cache(maxsize=maxsize)(self.compute)
+
+    def arity(self) -> int:
+        return self.function.arity()
+
+    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
+        self.interpreter = interpreter
+        if LoxArray in map(type, arguments):
+            # An array is keyed by identity, but its elements can change
+            # between calls, so a call given one always runs, uncounted.
+            return self.function.call(interpreter, arguments)
+        return self.cached(tuple([(type(argument), argument) for argument in arguments]))
+
+    def compute(self, key: tuple[tuple[type, object], ...]) -> object:
+        return self.function.call(self.interpreter, [argument for _, argument in key])
+
+    def __str__(self):
+        return f"<memo {self.function}>"
+
+@native("memo", "memo", 1)
+def memo(function: object) -> object:
+    # memo(fn) returns fn with its results cached. Assigning it back to the
+    # name, as in `fib = memo(fib);`, makes recursive calls hit the cache too.
+    # Natives that aren't pure, like clock or the async ones, and anything
+    # that isn't callable come back unchanged, the latter to fail as usual
+    # where it is called. Lox functions don't say; that's up to the script.
+    if not isinstance(function, loxcallable.LoxCallable):
+        return function
+    if not getattr(function, "pure", True):
+        return function
+    return MemoizedFunction(function)
+
+@native("memo", "memoHits", 1)
+def memo_hits(function: object) -> float | None:
+    # memoHits(fn) is the number of calls answered from the cache, or nil if
+    # fn isn't memoized.
+    if not isinstance(function, MemoizedFunction):
+        return None
+    return float(function.cached.cache_info().hits)
+
+@native("memo", "memoMisses", 1)
+def memo_misses(function: object) -> float | None:
+    # memoMisses(fn) is the number of calls that had to run fn.
+    if not isinstance(function, MemoizedFunction):
+        return None
+    return float(function.cached.cache_info().misses)
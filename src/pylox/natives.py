@@ -0,0 +1,168 @@
+import math
+import time
+from array import array as typed_array
+from typing import Callable, Iterable
+import loxcallable
+from environment import Environment
+from loxarray import LoxArray
+
+class NativeError(Exception):
+    # Raised by a native for bad arguments. The call site turns it into a
+    # RuntimeError at the call's closing parenthesis.
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+class Native(loxcallable.LoxCallable):
+    """
+    A Python function callable from Lox with a fixed number of arguments.
+    Every engine calls function(*arguments) on one of these directly, after
+    checking param_count, without going through call().
+
+    A pure native returns the same for arguments of the same value, makes
+    nothing new and changes nothing, so memo() may cache it. Anything else,
+    like clock, is left uncached. Calls given an array, which can change in
+    place, are never cached either.
+    """
+
+    __slots__ = ("name", "function", "param_count", "pure")
+
+    def __init__(self, name: str, function: Callable[..., object], arity: int, pure: bool = False) -> None:
+        self.name: str = name
+        self.function: Callable[..., object] = function
+        self.param_count: int = arity
+        self.pure: bool = pure
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
+        return self.function(*arguments)
+
+    def __str__(self):
+        return "<native fn>"
+
+# The natives of every module, by module and then by the name Lox code calls
+# them by.
+MODULES: dict[str, dict[str, loxcallable.LoxCallable]] = {}
+
+# Most elements range() or array() will make in one go; more is an error
+# rather than a MemoryError out of the interpreter.
+MAX_ELEMENTS = 1 << 27
+
+# Modules every interpreter starts with.
+PRELUDE = ("core", "memo", "strings", "numbers", "arrays")
+
+def register(module: str, name: str, function: loxcallable.LoxCallable) -> None:
+    MODULES.setdefault(module, {})[name] = function
+
+def native(module: str, name: str, arity: int, pure: bool = False) -> Callable:
+    # Registers the decorated Python function as a Native, and leaves it as
+    # it was for Python callers.
+    def decorate(function: Callable[..., object]) -> Callable[..., object]:
+        register(module, name, Native(name, function, arity, pure))
+        return function
+    return decorate
+
+def install(environment: Environment, modules: Iterable[str] = PRELUDE) -> None:
+    for module in modules:
+        for name, function in MODULES[module].items():
+            environment.define(name, function)
+
+def numbers(elements: list[object] | typed_array, name: str) -> list[float] | typed_array:
+    # Numeric storage needs no checking. A list has its element types checked
+    # in one pass through C, rather than one isinstance() at a time.
+    if type(elements) is typed_array:
+        return elements
+    if not set(map(type, elements)) <= {float}:
+        raise NativeError(f"{name}() needs an array of numbers.")
+    return elements
+
+def strings(elements: list[object], name: str) -> list[str]:
+    if not set(map(type, elements)) <= {str}:
+        raise NativeError(f"{name}() needs an array of strings.")
+    return elements
+
+def array_argument(value: object, name: str) -> list[object] | typed_array:
+    if type(value) is not LoxArray:
+        raise NativeError(f"{name}() needs an array.")
+    return value.elements
+
+def count_argument(value: object, name: str) -> int:
+    if not isinstance(value, float) or not value.is_integer() or value < 0:
+        raise NativeError(f"{name}() needs a whole number of elements.")
+    if value > MAX_ELEMENTS:
+        raise NativeError(f"{name}() can't make more than {MAX_ELEMENTS} elements.")
+    return int(value)
+
+@native("core", "clock", 0)
+def clock() -> float:
+    return time.time()
+
+@native("strings", "split", 2)
+def split(string: object, separator: object) -> LoxArray:
+    # An empty separator splits a string into its characters.
+    if not isinstance(string, str) or not isinstance(separator, str):
+        raise NativeError("split() needs a string and a separator string.")
+    return LoxArray(string.split(separator) if separator else list(string))
+
+@native("strings", "join", 2, pure=True)
+def join(array: object, separator: object) -> str:
+    if not isinstance(separator, str):
+        raise NativeError("join() needs a separator string.")
+    return separator.join(strings(array_argument(array, "join"), "join"))
+
+@native("numbers", "sum", 1, pure=True)
+def sum_(array: object) -> float:
+    return sum(numbers(array_argument(array, "sum"), "sum"), 0.0)
+
+@native("numbers", "min", 1, pure=True)
+def min_(array: object) -> float | None:
+    # nil for an empty array.
+    return min(numbers(array_argument(array, "min"), "min"), default=None)
+
+@native("numbers", "max", 1, pure=True)
+def max_(array: object) -> float | None:
+    return max(numbers(array_argument(array, "max"), "max"), default=None)
+
+@native("numbers", "range", 2)
+def range_(start: object, end: object) -> LoxArray:
+    # start, start + 1, ... for as long as they're below end.
+    if not isinstance(start, float) or not isinstance(end, float):
+        raise NativeError("range() needs a start and an end number.")
+    if not end - start <= MAX_ELEMENTS:
+        # Infinite and NaN bounds end up here too.
+        raise NativeError(f"range() can't make more than {MAX_ELEMENTS} elements.")
+    return LoxArray(typed_array('d', [start + index for index in range(max(0, math.ceil(end - start)))]))
+
+@native("arrays", "array", 1)
+def array(size: object) -> LoxArray:
+    # size nils, to fill() or set one by one. [] makes an empty one.
+    return LoxArray([None] * count_argument(size, "array"))
+
+@native("arrays", "len", 1, pure=True)
+def len_(value: object) -> float:
+    if isinstance(value, str):
+        return float(len(value))
+    return float(len(array_argument(value, "len")))
+
+@native("arrays", "push", 2)
+def push(array: object, value: object) -> None:
+    array_argument(array, "push")
+    array.append(value)
+    return None
+
+@native("arrays", "fill", 2)
+def fill(array: object, value: object) -> LoxArray:
+    # Sets every element to value in one go, and returns the array. Filling
+    # with a number makes it numeric.
+    array_argument(array, "fill")
+    array.fill(value)
+    return array
+
+@native("arrays", "copy", 1)
+def copy(array: object) -> LoxArray:
+    # A new array with the same elements, stored the same way; the elements
+    # themselves are shared.
+    return LoxArray(array_argument(array, "copy")[:])
@@ -0,0 +1,236 @@
+import expr
+import stmt
+import operator
+from token import TokenType
+from dispatch import dispatch_table
+
+# Operators folded when both operands are number literals. Division is left
+# out so dividing by zero still fails at runtime, where it would have.
+NUMERIC_OPERATORS = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.PLUS: operator.add,
+    TokenType.STAR: operator.mul,
+}
+
+def is_truthy(value: object) -> bool:
+    return value is not None and value is not False
+
+def is_equal(a: object, b: object) -> bool:
+    # Interpreter.is_equal, which folded comparisons have to agree with.
+    if a is None and b is None:
+        return True
+    if a is None:
+        return False
+    return a == b
+
+class Optimizer(expr.Visitor, stmt.Visitor):
+    """
+    Simplifies a parsed tree before it is resolved: folds operators over
+    literals, drops groupings, short-circuits logical operators with a literal
+    left operand and prunes branches and loops whose condition is a literal.
+    Anything that would fail at runtime, like adding a number to a string, is
+    left alone so it still fails there, on the same line. Nodes are never
+    changed in place; a node whose children didn't change is returned as is.
+    """
+
+    def __init__(self) -> None:
+        self.handlers = dispatch_table(self)
+
+    def optimize(self, statements: list[stmt.Stmt]) -> list[stmt.Stmt]:
+        handlers = self.handlers
+        optimized: list[stmt.Stmt] = []
+        for statement in statements:
+            # A declaration the parser gave up on is None. Keep it, so a tree
+            # with syntax errors comes back the same length.
+            try:
+                result: stmt.Stmt | None = handlers[type(statement)](statement) if statement is not None else None
+            except RecursionError:
+                # Too deep to walk recursively; it runs as parsed instead.
+                result = statement
+            if result is not None or statement is None:
+                optimized.append(result)
+        return optimized
+
+    def expression(self, expression: expr.Expr) -> expr.Expr:
+        return self.handlers[type(expression)](expression)
+
+    def statement(self, statement: stmt.Stmt) -> stmt.Stmt:
+        # Where the grammar needs a statement, one pruned away entirely
+        # becomes an empty block.
+        result: stmt.Stmt | None = self.handlers[type(statement)](statement)
+        return result if result is not None else stmt.Block([])
+
+    def visit_block_stmt(self, statement: stmt.Block) -> stmt.Stmt:
+        statements: list[stmt.Stmt] = self.optimize(statement.statements)
+        if statements == statement.statements:
+            return statement
+        return stmt.Block(statements)
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> stmt.Stmt:
+        expression: expr.Expr = self.expression(statement.expression)
+        if expression is statement.expression:
+            return statement
+        return stmt.Expression(expression)
+
+    def visit_function_stmt(self, statement: stmt.Function) -> stmt.Stmt:
+        body: list[stmt.Stmt] = self.optimize(statement.body)
+        if body == statement.body:
+            return statement
+        return stmt.Function(statement.name, statement.params, body)
+
+    def visit_if_stmt(self, statement: stmt.If) -> stmt.Stmt | None:
+        condition: expr.Expr = self.expression(statement.condition)
+
+        if isinstance(condition, expr.Literal):
+            if is_truthy(condition.value):
+                return self.statement(statement.then_branch)
+            if statement.else_branch is not None:
+                return self.statement(statement.else_branch)
+            return None
+
+        then_branch: stmt.Stmt = self.statement(statement.then_branch)
+        else_branch: stmt.Stmt | None = None
+        if statement.else_branch is not None:
+            else_branch = self.statement(statement.else_branch)
+
+        if condition is statement.condition and then_branch is statement.then_branch and else_branch is statement.else_branch:
+            return statement
+        return stmt.If(statement.keyword, condition, then_branch, else_branch)
+
+    def visit_print_stmt(self, statement: stmt.Print) -> stmt.Stmt:
+        expression: expr.Expr = self.expression(statement.expression)
+        if expression is statement.expression:
+            return statement
+        return stmt.Print(statement.keyword, expression)
+
+    def visit_return_stmt(self, statement: stmt.Return) -> stmt.Stmt:
+        if statement.value is None:
+            return statement
+        value: expr.Expr = self.expression(statement.value)
+        if value is statement.value:
+            return statement
+        return stmt.Return(statement.keyword, value)
+
+    def visit_var_stmt(self, statement: stmt.Var) -> stmt.Stmt:
+        if statement.initializer is None:
+            return statement
+        initializer: expr.Expr = self.expression(statement.initializer)
+        if initializer is statement.initializer:
+            return statement
+        return stmt.Var(statement.name, initializer)
+
+    def visit_while_stmt(self, statement: stmt.While) -> stmt.Stmt | None:
+        condition: expr.Expr = self.expression(statement.condition)
+        if isinstance(condition, expr.Literal) and not is_truthy(condition.value):
+            return None
+
+        body: stmt.Stmt = self.statement(statement.body)
+        if condition is statement.condition and body is statement.body:
+            return statement
+        return stmt.While(statement.keyword, condition, body)
+
+    def visit_assign_expr(self, expression: expr.Assign) -> expr.Expr:
+        value: expr.Expr = self.expression(expression.value)
+        if value is expression.value:
+            return expression
+        return expr.Assign(expression.name, value)
+
+    def visit_binary_expr(self, expression: expr.Binary) -> expr.Expr:
+        left: expr.Expr = self.expression(expression.left)
+        right: expr.Expr = self.expression(expression.right)
+
+        if isinstance(left, expr.Literal) and isinstance(right, expr.Literal):
+            folded: expr.Literal | None = self.fold_binary(expression.operator.tokentype, left.value, right.value)
+            if folded is not None:
+                return folded
+
+        if left is expression.left and right is expression.right:
+            return expression
+        return expr.Binary(left, expression.operator, right)
+
+    @staticmethod
+    def fold_binary(tokentype: TokenType, a: object, b: object) -> expr.Literal | None:
+        if tokentype == TokenType.EQUAL_EQUAL:
+            return expr.Literal(is_equal(a, b))
+        if tokentype == TokenType.BANG_EQUAL:
+            return expr.Literal(not is_equal(a, b))
+
+        if tokentype in NUMERIC_OPERATORS and type(a) is float and type(b) is float:
+            return expr.Literal(NUMERIC_OPERATORS[tokentype](a, b))
+        if tokentype == TokenType.SLASH and type(a) is float and type(b) is float and b != 0.0:
+            return expr.Literal(a / b)
+        if tokentype == TokenType.PLUS and type(a) is str and type(b) is str:
+            return expr.Literal(a + b)
+
+        return None
+
+    def visit_call_expr(self, expression: expr.Call) -> expr.Expr:
+        callee: expr.Expr = self.expression(expression.callee)
+        arguments: list[expr.Expr] = [self.expression(argument) for argument in expression.arguments]
+        if callee is expression.callee and arguments == expression.arguments:
+            return expression
+        return expr.Call(callee, expression.paren, arguments)
+
+    def visit_array_expr(self, expression: expr.Array) -> expr.Expr:
+        # Never a literal itself: each evaluation makes a new array.
+        elements: list[expr.Expr] = [self.expression(element) for element in expression.elements]
+        if elements == expression.elements:
+            return expression
+        return expr.Array(expression.bracket, elements)
+
+    def visit_index_expr(self, expression: expr.Index) -> expr.Expr:
+        sequence: expr.Expr = self.expression(expression.sequence)
+        index: expr.Expr = self.expression(expression.index)
+        if sequence is expression.sequence and index is expression.index:
+            return expression
+        return expr.Index(sequence, expression.bracket, index)
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> expr.Expr:
+        sequence: expr.Expr = self.expression(expression.sequence)
+        index: expr.Expr = self.expression(expression.index)
+        value: expr.Expr = self.expression(expression.value)
+        if sequence is expression.sequence and index is expression.index and value is expression.value:
+            return expression
+        return expr.SetIndex(sequence, expression.bracket, index, value)
+
+    def visit_grouping_expr(self, expression: expr.Grouping) -> expr.Expr:
+        # Only the parser cares about parentheses.
+        return self.expression(expression.expression)
+
+    def visit_literal_expr(self, expression: expr.Literal) -> expr.Expr:
+        return expression
+
+    def visit_logical_expr(self, expression: expr.Logical) -> expr.Expr:
+        left: expr.Expr = self.expression(expression.left)
+
+        if isinstance(left, expr.Literal):
+            # The operator evaluates to its left operand if that decides the
+            # outcome, or to its right operand otherwise.
+            if is_truthy(left.value) == (expression.operator.tokentype == TokenType.OR):
+                return left
+            return self.expression(expression.right)
+
+        right: expr.Expr = self.expression(expression.right)
+        if left is expression.left and right is expression.right:
+            return expression
+        return expr.Logical(left, expression.operator, right)
+
+    def visit_unary_expr(self, expression: expr.Unary) -> expr.Expr:
+        right: expr.Expr = self.expression(expression.right)
+
+        if isinstance(right, expr.Literal):
+            if expression.operator.tokentype == TokenType.BANG:
+                return expr.Literal(not is_truthy(right.value))
+            if type(right.value) is float:
+                return expr.Literal(-right.value)
+
+        if right is expression.right:
+            return expression
+        return expr.Unary(expression.operator, right)
+
+    def visit_variable_expr(self, expression: expr.Variable) -> expr.Expr:
+        return expression
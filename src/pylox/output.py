@@ -0,0 +1,40 @@
+import sys
+from typing import TextIO
+
+# Characters collected before they are written out in one go.
+FLUSH_SIZE = 1 << 16
+
+class BufferedOutput:
+    """
+    Where the interpreter sends what Lox prints, unless it is given some
+    other sink. Anything with write() and flush() will do in its place: an
+    io.StringIO to capture the output, or an open file.
+
+    Lines are collected and written to the stream as one string once there
+    are limit characters of them, and whenever flush() is called, which
+    Pylox does after running each program and before reporting an error.
+    Without a stream, that is whatever sys.stdout is at the time, so the
+    output follows redirect_stdout() even for an interpreter made earlier.
+    """
+
+    __slots__ = ("stream", "limit", "pending", "size")
+
+    def __init__(self, stream: TextIO | None = None, limit: int = FLUSH_SIZE) -> None:
+        self.stream: TextIO | None = stream
+        self.limit: int = limit
+        self.pending: list[str] = []
+        self.size: int = 0
+
+    def write(self, text: str) -> None:
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        stream: TextIO = sys.stdout if self.stream is None else self.stream
+        if self.pending:
+            stream.write("".join(self.pending))
+            self.pending.clear()
+            self.size = 0
+        stream.flush()
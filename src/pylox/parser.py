@@ -1,6 +1,7 @@
 from token import TokenType, Token
 import expr
 import stmt
+from typing import Callable, Iterator
 from __init__ import Pylox
 
 class Parser:
@@ -8,8 +9,15 @@ class Parser:
     class ParseError(Exception):
         pass
 
-    def __init__(self, tokens: list[Token]) -> None:
-        self.tokens = tokens
+    def __init__(self, tokens: list[Token] | Iterator[Token], reporter: Callable[[int | Token, str], None] = Pylox.error) -> None:
+        # Tokens from a stream are only read as the parser gets to them, into
+        # a list that fetch() empties of those it's done with.
+        self.stream: Iterator[Token] | None = None
+        if not isinstance(tokens, list):
+            self.stream, tokens = tokens, []
+        self.tokens: list[Token] = tokens
+        # Called with each syntax error; Pylox.error prints it to stderr.
+        self.reporter = reporter
         self.current = 0
 
     def expression(self) -> expr.Expr:
@@ -48,6 +56,7 @@ class Parser:
         return self.expression_statement()
     
     def for_statement(self) -> stmt.Stmt:
+        keyword: Token = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
 
         initializer: stmt.Stmt = None # redundant for python but including in the 1:1 port
@@ -76,7 +85,7 @@ class Parser:
         if condition is None:
             condition = expr.Literal(True)
         
-        body = stmt.While(condition, body)
+        body = stmt.While(keyword, condition, body)
 
         if initializer:
             body = stmt.Block([initializer, body])
@@ -84,22 +93,34 @@ class Parser:
         return body
     
     def if_statement(self) -> stmt.Stmt:
-        self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
-        condition: expr.Expr = self.expression() # The true human condition.
-        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
-
-        then_branch: stmt.Stmt = self.statement()
+        # An `else if` chain is read in a loop and nested afterwards, rather
+        # than recursing once per link, so long generated chains still parse.
+        branches: list[tuple[Token, expr.Expr, stmt.Stmt]] = []
         else_branch: stmt.Stmt = None
-        
-        if self.match(TokenType.ELSE):
-            else_branch = self.statement()
-        
-        return stmt.If(condition, then_branch, else_branch)
+
+        while True:
+            keyword: Token = self.previous()
+            self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
+            condition: expr.Expr = self.expression() # The true human condition.
+            self.consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
+
+            branches.append((keyword, condition, self.statement()))
+
+            if not self.match(TokenType.ELSE):
+                break
+            if not self.match(TokenType.IF):
+                else_branch = self.statement()
+                break
+
+        for keyword, condition, then_branch in reversed(branches):
+            else_branch = stmt.If(keyword, condition, then_branch, else_branch)
+        return else_branch
     
     def print_statement(self) -> stmt.Stmt:
+        keyword: Token = self.previous()
         value: expr.Expr = self.expression() # Isn't that what it's all about?
         self.consume(TokenType.SEMICOLON, "Expect ';' after value.")
-        return stmt.Print(value)
+        return stmt.Print(keyword, value)
     
     def return_statement(self) -> stmt.Stmt:
         keyword: Token = self.previous()
@@ -121,12 +142,13 @@ class Parser:
         return stmt.Var(name, initializer)
 
     def while_statement(self) -> stmt.Stmt:
+        keyword: Token = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.)")
         condition: expr.Expr = self.expression()
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after condition.")
         body: stmt.Stmt = self.statement()
 
-        return stmt.While(condition, body)
+        return stmt.While(keyword, condition, body)
     
     def expression_statement(self) -> stmt.Stmt:
         expression: expr.Expr = self.expression()
@@ -140,7 +162,7 @@ class Parser:
         if not self.check(TokenType.RIGHT_PAREN):
             while True:
                 if len(parameters) >= 255:
-                    Parser.error(self.peek(), "Can't  have more than 255 parameters")
+                    self.error(self.peek(), "Can't  have more than 255 parameters")
                 
                 parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
 
@@ -171,6 +193,9 @@ class Parser:
             if isinstance(expression, expr.Variable):
                 name: Token = expression.name
                 return expr.Assign(name, value)
+
+            if isinstance(expression, expr.Index):
+                return expr.SetIndex(expression.sequence, expression.bracket, expression.index, value)
             
             self.error(equals, "Invalid assignment target.")
         
@@ -228,7 +253,23 @@ class Parser:
         return self.peek().tokentype == TokenType.EOF
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        try:
+            return self.tokens[self.current]
+        except IndexError:
+            return self.fetch()
+
+    def fetch(self) -> Token:
+        # Reads the current token from the stream. The parser only ever looks
+        # at the current token and the one before it, and never goes back, so
+        # everything older than that is dropped first.
+        tokens: list[Token] = self.tokens
+        if self.current > 1:
+            del tokens[:self.current - 1]
+            self.current = 1
+        # The scanner stops after EOF, but the parser may keep peeking at it.
+        token: Token | None = next(self.stream, None) if self.stream is not None else None
+        tokens.append(token or tokens[-1])
+        return tokens[self.current]
 
     def previous(self) -> Token:
         return self.tokens[self.current - 1]
@@ -275,7 +316,7 @@ class Parser:
         if not self.check(TokenType.RIGHT_PAREN):
             while True:
                 if len(arguments) >= 255:
-                    Parser.error(self.peek(), "Can't have more than 255 arguments.")
+                    self.error(self.peek(), "Can't have more than 255 arguments.")
                 arguments.append(self.expression())
                 if not self.match(TokenType.COMMA):
                     break
@@ -290,6 +331,10 @@ class Parser:
         while True:
             if self.match(TokenType.LEFT_PAREN):
                 expression = self.finish_call(expression)
+            elif self.match(TokenType.LEFT_BRACKET):
+                index: expr.Expr = self.expression()
+                bracket: Token = self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after index.")
+                expression = expr.Index(expression, bracket, index)
             else:
                 break
         
@@ -316,18 +361,28 @@ class Parser:
             expression: expr.Expr = self.expression()
             self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return expr.Grouping(expression)
+
+        if self.match(TokenType.LEFT_BRACKET):
+            bracket: Token = self.previous()
+            elements: list[expr.Expr] = []
+            if not self.check(TokenType.RIGHT_BRACKET):
+                while True:
+                    elements.append(self.expression())
+                    if not self.match(TokenType.COMMA):
+                        break
+            self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after array elements.")
+            return expr.Array(bracket, elements)
         
-        raise Parser.error(self.peek(), "Expect expression.")
+        raise self.error(self.peek(), "Expect expression.")
 
     def consume(self, ttype: TokenType, message: str) -> Token:
         if self.check(ttype):
             return self.advance()
         
-        raise Parser.error(self.peek(), message)
+        raise self.error(self.peek(), message)
     
-    @staticmethod
-    def error(token: Token, message: str) -> "Parser.ParseError":
-        Pylox.error(token, message)
+    def error(self, token: Token, message: str) -> "Parser.ParseError":
+        self.reporter(token, message)
         return Parser.ParseError()
     
     def synchronize(self) -> None:
@@ -363,5 +418,23 @@ class Parser:
     def parse(self) -> list[stmt.Stmt]:
         statements: list[stmt.Stmt] = []
         while not self.is_at_end():
-            statements.append(self.declaration())
+            statements.append(self.top_level_declaration())
         return statements
+
+    def parse_iter(self) -> Iterator[stmt.Stmt]:
+        # Hands out each top-level declaration as soon as it has been parsed,
+        # so a caller can run it before the rest of the source has been read.
+        while not self.is_at_end():
+            yield self.top_level_declaration()
+
+    def top_level_declaration(self) -> stmt.Stmt:
+        # The parser recurses once per level of parentheses, blocks, calls or
+        # arrays, a dozen Python frames at a time, so with the default
+        # recursion limit about 80 levels fit on every engine. Anything
+        # deeper is a syntax error rather than a crash.
+        try:
+            return self.declaration()
+        except RecursionError:
+            self.error(self.peek(), "Too much nesting.")
+            self.synchronize()
+            return None
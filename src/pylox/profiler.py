@@ -0,0 +1,172 @@
+import expr
+import stmt
+import time
+from typing import Callable, TextIO
+from token import Token
+from interpreter import Interpreter
+from loxfunction import LoxFunction
+from environment import Environment
+from completion import RETURN
+
+SCRIPT = "<script>"
+
+class Profiler:
+    """
+    Deterministic profile of one run: every call of a Lox function and every
+    statement executed is recorded, along with wall time spent in each
+    function including and excluding the functions it called.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.calls: dict[str, int] = {}
+        self.inclusive: dict[str, float] = {}
+        self.exclusive: dict[str, float] = {}
+        self.line_hits: dict[int, int] = {}
+        # Exclusive time of every distinct call stack, for flame graphs.
+        self.stacks: dict[tuple[str, ...], float] = {}
+
+        # One [name, start, time spent in callees] per active call, and how
+        # many times each function is active so recursion isn't counted twice
+        # towards inclusive time.
+        self.frames: list[list] = []
+        self.names: list[str] = []
+        self.active: dict[str, int] = {}
+
+    def start(self) -> None:
+        self.enter(SCRIPT)
+
+    def stop(self) -> None:
+        while self.frames:
+            self.leave()
+
+    def enter(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.active[name] = self.active.get(name, 0) + 1
+        self.names.append(name)
+        self.frames.append([name, self.clock(), 0.0])
+
+    def leave(self) -> None:
+        name, start, callees = self.frames.pop()
+        elapsed: float = self.clock() - start
+        own: float = elapsed - callees
+
+        stack: tuple[str, ...] = tuple(self.names)
+        self.names.pop()
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + own
+        self.exclusive[name] = self.exclusive.get(name, 0.0) + own
+
+        self.active[name] -= 1
+        if self.active[name] == 0:
+            self.inclusive[name] = self.inclusive.get(name, 0.0) + elapsed
+
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+    def hit(self, line: int) -> None:
+        self.line_hits[line] = self.line_hits.get(line, 0) + 1
+
+    def report(self, out: TextIO, lines: int = 20) -> None:
+        print(f"{'function':<24} {'calls':>9} {'inclusive (s)':>14} {'exclusive (s)':>14}", file=out)
+        for name in sorted(self.calls, key=lambda name: self.exclusive.get(name, 0.0), reverse=True):
+            print(f"{name:<24} {self.calls[name]:>9} {self.inclusive.get(name, 0.0):>14.6f} {self.exclusive.get(name, 0.0):>14.6f}", file=out)
+
+        print("", file=out)
+        print(f"{'line':>6} {'hits':>12}", file=out)
+        for line, hits in sorted(self.line_hits.items(), key=lambda item: item[1], reverse=True)[:lines]:
+            print(f"{line:>6} {hits:>12}", file=out)
+
+    def write_collapsed(self, out: TextIO) -> None:
+        # One "outer;inner;innermost microseconds" line per stack, the format
+        # flamegraph.pl and speedscope read.
+        for stack, seconds in self.stacks.items():
+            microseconds: int = round(seconds * 1e6)
+            if microseconds > 0:
+                print(f"{';'.join(stack)} {microseconds}", file=out)
+
+def first_line(node: expr.Expr | stmt.Stmt | list | None) -> int:
+    # Line of the first token under a node, or 0 if there's none. Every
+    # statement but an expression statement has a keyword or name as its
+    # first field, so that's the one found for them. Expression statements
+    # only have the tokens of their expression, and a constant folded by the
+    # optimizer has none left.
+    if isinstance(node, Token):
+        return node.line
+    if isinstance(node, list):
+        for inner in node:
+            line: int = first_line(inner)
+            if line:
+                return line
+        return 0
+    if isinstance(node, (expr.Expr, stmt.Stmt)):
+        # Plain nodes from tool.py without --slots keep their fields in a
+        # dict, in the same order.
+        for field in getattr(node, "__slots__", None) or vars(node):
+            line = first_line(getattr(node, field))
+            if line:
+                return line
+    return 0
+
+class ProfiledFunction(LoxFunction):
+    # Not a LoxFunction as far as the interpreter's fast path for calls goes,
+    # so every call comes through here. A tail call loops like it does in
+    # LoxFunction.call(), and counts as a call of its own that starts as the
+    # one before it ends.
+
+    def call(self, interpreter: 'ProfilingInterpreter', arguments: list[object]) -> object:
+        profiler: Profiler = interpreter.profiler
+        function: ProfiledFunction = self
+        profiler.enter(function.declaration.name.lexeme)
+        try:
+            while True:
+                environment: Environment = Environment(function.closure, arguments)
+                if interpreter.execute_block(function.body, environment) is not RETURN:
+                    return None
+                if interpreter.tail_call is None:
+                    return interpreter.return_value
+
+                function, arguments = interpreter.tail_call
+                interpreter.tail_call = None
+                profiler.leave()
+                profiler.enter(function.declaration.name.lexeme)
+        finally:
+            profiler.leave()
+
+class ProfilingInterpreter(Interpreter):
+    """
+    The tree-walking Interpreter with hooks for a Profiler: functions it
+    declares time their calls, and every statement counts a hit on its line.
+    Blocks don't, as they only hold statements that count for themselves.
+    """
+
+    function_class = ProfiledFunction
+
+    def __init__(self, profiler: Profiler) -> None:
+        super().__init__()
+        self.profiler = profiler
+        self.lines: dict[stmt.Stmt, int] = {}
+
+        for node, handler in list(self.handlers.items()):
+            if issubclass(node, stmt.Stmt) and node is not stmt.Block:
+                self.handlers[node] = self.counting(handler)
+
+    def counting(self, handler: Callable[[stmt.Stmt], object]) -> Callable[[stmt.Stmt], object]:
+        lines: dict[stmt.Stmt, int] = self.lines
+        hit = self.profiler.hit
+
+        def count(statement: stmt.Stmt) -> object:
+            line: int | None = lines.get(statement)
+            if line is None:
+                line = lines[statement] = first_line(statement)
+            if line:
+                hit(line)
+            return handler(statement)
+        return count
+
+    def clear_caches(self) -> None:
+        super().clear_caches()
+        self.lines.clear()
+
+    def visit_function_stmt(self, statement: stmt.Function) -> None:
+        self.define(statement.name.lexeme, ProfiledFunction(statement, self.environment))
+        return None
@@ -0,0 +1,169 @@
+import io
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, TextIO
+import expr
+import stmt
+import runtimeerror
+from token import Token, TokenType
+from completion import RETURN
+from environment import Environment, UNDEFINED
+from interpreter import Interpreter
+
+class Diagnostic(NamedTuple):
+    # phase is "syntax" for scanning and parsing, "resolve" or "runtime".
+    phase: str
+    line: int
+    where: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"[line {self.line}] Error{self.where}: {self.message}"
+
+class Reporter:
+    # Stands in for Pylox.error, collecting what it would have printed.
+
+    def __init__(self, phase: str) -> None:
+        self.phase: str = phase
+        self.diagnostics: list[Diagnostic] = []
+
+    def __call__(self, location: int | Token, message: str) -> None:
+        if isinstance(location, int):
+            self.diagnostics.append(Diagnostic(self.phase, location, "", message))
+        elif location.tokentype == TokenType.EOF:
+            self.diagnostics.append(Diagnostic(self.phase, location.line, " at end", message))
+        else:
+            self.diagnostics.append(Diagnostic(self.phase, location.line, f" at '{location.lexeme}'", message))
+
+class CompileError(Exception):
+
+    def __init__(self, diagnostics: list[Diagnostic]) -> None:
+        super().__init__("\n".join(str(diagnostic) for diagnostic in diagnostics))
+        self.diagnostics = diagnostics
+
+class RunResult(NamedTuple):
+    # What the program printed, unless run() was given its own output.
+    output: str | None
+    # Every global the program ended up with, natives included.
+    globals: dict[str, object]
+    # The runtime error that stopped the program, if one did.
+    error: Diagnostic | None
+
+class Program:
+    """
+    A script scanned, parsed, optimized and resolved once, for running any
+    number of times. Nothing in it changes after compile(), and every run()
+    gets an Interpreter of its own, so one Program can run on many threads
+    at once. Nothing here prints or touches the error flags on Pylox.
+    """
+
+    __slots__ = ("statements", "locals", "tail_calls")
+
+    statements: tuple[stmt.Stmt, ...]
+    locals: Mapping[expr.Expr, tuple[int, int]]
+    tail_calls: Mapping[stmt.Return, stmt.Function]
+
+    def __init__(self, statements: tuple[stmt.Stmt, ...], locals: Mapping[expr.Expr, tuple[int, int]], tail_calls: Mapping[stmt.Return, stmt.Function]) -> None:
+        object.__setattr__(self, "statements", statements)
+        object.__setattr__(self, "locals", MappingProxyType(dict(locals)))
+        object.__setattr__(self, "tail_calls", MappingProxyType(dict(tail_calls)))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Program objects are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Program objects are immutable")
+
+    @staticmethod
+    def compile(source: str, optimize: bool = True) -> 'Program':
+        # Raises CompileError with every syntax or resolution error found.
+        # optimize=False skips the Optimizer, like --no-optimize, whatever
+        # the command line was given.
+        from scanner import RegexScanner
+        from parser import Parser
+        from resolver import Resolver
+        from optimizer import Optimizer
+
+        reporter: Reporter = Reporter("syntax")
+        statements: list[stmt.Stmt] = Parser(RegexScanner(source, reporter).scan_tokens(), reporter).parse()
+        if reporter.diagnostics:
+            raise CompileError(reporter.diagnostics)
+
+        if optimize:
+            statements = Optimizer().optimize(statements)
+
+        # The resolver leaves its tables on an interpreter, which is only
+        # needed for them.
+        resolution: Interpreter = Interpreter()
+        reporter.phase = "resolve"
+        resolver: Resolver = Resolver(resolution, reporter=reporter)
+        for statement in statements:
+            resolver.resolve(statement)
+        if reporter.diagnostics:
+            raise CompileError(reporter.diagnostics)
+
+        return Program(tuple(statements), resolution.locals, resolution.tail_calls)
+
+    def run(self, globals: Mapping[str, object] | None = None, output: TextIO | None = None) -> RunResult:
+        """
+        Runs the program on the tree-walking interpreter, in fresh globals
+        with the natives and anything given in globals already defined; the
+        globals of an earlier result carry its state over. What the program
+        prints is returned, or written to output if given.
+        """
+        captured: io.StringIO | None = io.StringIO() if output is None else None
+        interpreter: Interpreter = self.prepare(Interpreter(output=captured or output), globals)
+
+        error: Diagnostic | None = None
+        try:
+            for statement in self.statements:
+                if interpreter.execute(statement) is RETURN:
+                    break
+        except runtimeerror.RuntimeError as failure:
+            error = Diagnostic("runtime", failure.token.line, "", failure.message)
+        finally:
+            interpreter.output.flush()
+
+        return Program.result(interpreter, captured, error)
+
+    async def run_async(self, globals: Mapping[str, object] | None = None, output: TextIO | None = None) -> RunResult:
+        """
+        run(), as a coroutine on an AsyncInterpreter: async natives passed in
+        globals, like AsyncNative(fetch, 1), are awaited, and many runs can
+        go on at once as tasks on one event loop.
+        """
+        from asyncinterpreter import AsyncInterpreter, drive_async
+
+        captured: io.StringIO | None = io.StringIO() if output is None else None
+        interpreter: AsyncInterpreter = self.prepare(AsyncInterpreter(output=captured or output), globals)
+
+        error: Diagnostic | None = None
+        try:
+            for statement in self.statements:
+                if await drive_async(interpreter.handlers, interpreter.run_block([statement], interpreter.globals)) is RETURN:
+                    break
+        except runtimeerror.RuntimeError as failure:
+            error = Diagnostic("runtime", failure.token.line, "", failure.message)
+        finally:
+            interpreter.output.flush()
+
+        return Program.result(interpreter, captured, error)
+
+    def prepare(self, interpreter: Interpreter, globals: Mapping[str, object] | None) -> Interpreter:
+        # Shared between runs; read-only, since nothing resolves at runtime.
+        interpreter.locals = self.locals
+        interpreter.tail_calls = self.tail_calls
+
+        if globals is not None:
+            for name, value in globals.items():
+                interpreter.globals.define(name, value)
+        return interpreter
+
+    @staticmethod
+    def result(interpreter: Interpreter, captured: io.StringIO | None, error: Diagnostic | None) -> RunResult:
+        environment: Environment = interpreter.globals
+        values: dict[str, object] = {
+            name: environment.slots[slot]
+            for name, slot in environment.names.items()
+            if environment.slots[slot] is not UNDEFINED
+        }
+        return RunResult(captured.getvalue() if captured is not None else None, values, error)
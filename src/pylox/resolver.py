@@ -1,20 +1,39 @@
 import expr, stmt
 from interpreter import Interpreter
 from token import Token
+from dispatch import dispatch_table
 from enum import Enum
+from typing import Callable
 
 FunctionType = Enum("FunctionType", ["NONE", "FUNCTION"]) 
 
+class Scope(dict):
+    # Besides the declared/defined flag of every name, a scope remembers the
+    # slot each declaration occupies in the runtime frame. Slots are handed out
+    # in declaration order, which is also the order the interpreter defines
+    # them in, so redeclaring a name simply moves it to a fresh slot.
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.slots: dict[str, int] = {}
+        self.size: int = 0
+
 class Resolver(expr.Visitor, stmt.Visitor):
 
-    def __init__(self, interpreter: Interpreter) -> None:
+    def __init__(self, interpreter: Interpreter, dispatch: bool = True, reporter: Callable[[int | Token, str], None] = None) -> None:
+        self.handlers = dispatch_table(self, dispatch)
         self.interpreter = interpreter
+        # Called with each error found; by default Pylox.error, which prints
+        # it to stderr.
+        self.reporter = reporter
         self.scopes = []
         self.current_function = FunctionType.NONE
+        # Innermost function being resolved, for spotting tail calls to itself.
+        self.current_declaration: stmt.Function | None = None
 
     def visit_block_stmt(self, statement: stmt.Block) -> None:
         self.begin_scope()
-        self.resolve(stmt.statements)
+        self.resolve(statement.statements)
         self.end_scope()
         return None 
     
@@ -26,12 +45,12 @@ class Resolver(expr.Visitor, stmt.Visitor):
         self.declare(statement.name)
         self.define(statement.name)
 
-        self.resolve_function(statement)
+        self.resolve_function(statement, FunctionType.FUNCTION)
         return None
     
     def visit_if_stmt(self, statement: stmt.If) -> None:
         self.resolve(statement.condition)
-        self.resolve(statement.if_branch)
+        self.resolve(statement.then_branch)
         if not statement.else_branch is None:
             self.resolve(statement.else_branch)
         return None
@@ -41,37 +60,61 @@ class Resolver(expr.Visitor, stmt.Visitor):
         return None
     
     def visit_return_stmt(self, statement: stmt.Return) -> None:
+        if self.current_function == FunctionType.NONE:
+            self.report(statement.keyword, "Can't return from top-level code.")
+
         if not statement.value is None:
             self.resolve(statement.value)
+            self.resolve_tail_call(statement)
         return None
+
+    def resolve_tail_call(self, statement: stmt.Return) -> None:
+        # Nothing is left to do in this call once the one it returns has
+        # finished, so a call to the function itself can reuse its frame.
+        value: expr.Expr = statement.value
+        function: stmt.Function | None = self.current_declaration
+        if (function is not None and type(value) is expr.Call and type(value.callee) is expr.Variable
+                and value.callee.name.lexeme == function.name.lexeme):
+            self.interpreter.resolve_tail_call(statement, function)
+    
+    def resolve(self, statement: list[stmt.Stmt] | stmt.Stmt | expr.Expr) -> None:
+        handlers = self.handlers
+        if isinstance(statement, list):
+            for inner in statement:
+                handlers[type(inner)](inner)
+            return None
+        handlers[type(statement)](statement) # It's all about that self acceptance.
     
-    def resolve(self, statement: stmt.Stmt | expr.Expr) -> None:
-        statement.accept(self) # It's all about that self acceptance.
-    
-    def resolve_function(self, statement: stmt.Function) -> None:
+    def resolve_function(self, statement: stmt.Function, function_type: FunctionType) -> None:
+        enclosing_function: FunctionType = self.current_function
+        self.current_function = function_type
+        enclosing_declaration: stmt.Function | None = self.current_declaration
+        self.current_declaration = statement
         self.begin_scope()
 
         for param in statement.params:
             self.declare(param)
             self.define(param)
         
-        self.resolve(function.body)
+        self.resolve(statement.body)
         self.end_scope()
+        self.current_declaration = enclosing_declaration
+        self.current_function = enclosing_function
 
     def begin_scope(self) -> None:
-        self.scopes.append({})
+        self.scopes.append(Scope())
     
     def end_scope(self) -> None:
         self.scopes.pop()
     
-    def visit_var_statement(self, statement: stmt.Var) -> None:
+    def visit_var_stmt(self, statement: stmt.Var) -> None:
         self.declare(statement.name)
         if statement.initializer is not None:
             self.resolve(statement.initializer)
         self.define(statement.name)
         return None
 
-    def visit_while_statement(self, statement: stmt.While) -> None:
+    def visit_while_stmt(self, statement: stmt.While) -> None:
         self.resolve(statement.condition)
         self.resolve(statement.body)
         return None
@@ -80,7 +123,10 @@ class Resolver(expr.Visitor, stmt.Visitor):
         if len(self.scopes) == 0:
             return None
         
-        self.scopes[-1][name.lexeme] = False
+        scope: Scope = self.scopes[-1]
+        scope[name.lexeme] = False
+        scope.slots[name.lexeme] = scope.size
+        scope.size += 1
     
     def define(self, name: Token) -> None:
         if len(self.scopes) == 0:
@@ -90,23 +136,32 @@ class Resolver(expr.Visitor, stmt.Visitor):
     
     def visit_variable_expr(self, expression: expr.Variable) -> None:
         if len(self.scopes) > 0 and self.scopes[-1].get(expression.name.lexeme) == False:
-            from __init__ import Pylox
-            Pylox.error(expression.name, "Can't read local variable in it's own initializer.")
+            self.report(expression.name, "Can't read local variable in it's own initializer.")
         
         self.resolve_local(expression, expression.name)
         return None
     
+    def report(self, location: int | Token, message: str) -> None:
+        if self.reporter is None:
+            from __init__ import Pylox
+            Pylox.error(location, message)
+        else:
+            self.reporter(location, message)
+
     def resolve_local(self, expression: expr.Expr, name: Token) -> None:
         index: int = len(self.scopes) - 1
 
         while index >= 0:
             if name.lexeme in self.scopes[index]:
-                self.interpreter.resolve(expression, len(self.scopes) - 1 - index)
+                slot: int = self.scopes[index].slots[name.lexeme]
+                self.interpreter.resolve(expression, len(self.scopes) - 1 - index, slot)
                 return
+            index -= 1
     
     def visit_assign_expr(self, expression: expr.Assign) -> None:
         self.resolve(expression.value)
         self.resolve_local(expression, expression.name)
+        return None
     
     def visit_binary_expr(self, expression: expr.Binary) -> None:
         self.resolve(expression.left)
@@ -121,6 +176,22 @@ class Resolver(expr.Visitor, stmt.Visitor):
         
         return None
 
+    def visit_array_expr(self, expression: expr.Array) -> None:
+        for element in expression.elements:
+            self.resolve(element)
+        return None
+
+    def visit_index_expr(self, expression: expr.Index) -> None:
+        self.resolve(expression.sequence)
+        self.resolve(expression.index)
+        return None
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> None:
+        self.resolve(expression.sequence)
+        self.resolve(expression.index)
+        self.resolve(expression.value)
+        return None
+
     def visit_grouping_expr(self, expression: expr.Grouping) -> None:
         self.resolve(expression.expression)
         return None
@@ -1,3 +0,0 @@
-class ReturnException(RuntimeError):
-    def __init__(self, value: object) -> None:
-        self.value = value
\ No newline at end of file
@@ -1,3 +1,8 @@
+import re
+import gc
+import io
+import sys
+from typing import Callable, Iterable, Iterator
 from token import Token, TokenType
 from __init__ import Pylox
 
@@ -22,12 +27,15 @@ class Scanner:
         "while": TokenType.WHILE
     }
 
-    def __init__(self, source: str):
+    def __init__(self, source: str, reporter: Callable[[int | Token, str], None] = Pylox.error):
         self.source = source
+        # Called with each error found; Pylox.error prints it to stderr.
+        self.reporter = reporter
         self.tokens: list[Token] = []
         self.start: int = 0
         self.current: int = 0
         self.line: int = 1
+        self.numbers: dict[str, float] = {}
     
     def scan_tokens(self) -> None:
         while not self.is_at_end():
@@ -44,6 +52,8 @@ class Scanner:
             case ')': self.add_token(TokenType.RIGHT_PAREN)
             case '{': self.add_token(TokenType.LEFT_BRACE)
             case '}': self.add_token(TokenType.RIGHT_BRACE)
+            case '[': self.add_token(TokenType.LEFT_BRACKET)
+            case ']': self.add_token(TokenType.RIGHT_BRACKET)
             case ',': self.add_token(TokenType.COMMA)
             case '.': self.add_token(TokenType.DOT)
             case '-': self.add_token(TokenType.MINUS)
@@ -72,7 +82,7 @@ class Scanner:
                 elif (c.isalpha() or c == '_'):
                     self.identifier()
                 else:
-                    Pylox.error(self.line, "Unexpected character.")
+                    self.reporter(self.line, "Unexpected character.")
 
     def identifier(self) -> None:
         while True:
@@ -113,7 +123,7 @@ class Scanner:
         return c
     
     def add_token(self, ttype: TokenType, literal: object = None) -> None:
-        text: str = self.source[self.start:self.current]
+        text: str = sys.intern(self.source[self.start:self.current])
         self.tokens.append(Token(ttype, text, literal, self.line))
     
     def string(self) -> None:
@@ -123,12 +133,12 @@ class Scanner:
             self.advance()
         
         if self.is_at_end():
-            Pylox.error(self.line, "Unterminated string.")
+            self.reporter(self.line, "Unterminated string.")
             return
         
         self.advance()
 
-        value = self.source[self.start + 1: self.current - 1]
+        value = sys.intern(self.source[self.start + 1: self.current - 1])
         self.add_token(TokenType.STRING, value)
     
     def number(self) -> None:
@@ -142,6 +152,144 @@ class Scanner:
         while self.peek().isdigit():
             self.advance()
 
-        value = float(self.source[self.start:self.current])
+        text: str = self.source[self.start:self.current]
+        value: float | None = self.numbers.get(text)
+        if value is None:
+            value = self.numbers[text] = float(text)
         self.add_token(TokenType.NUMBER, value)
-            
+
+
+class RegexScanner:
+    # Produces the same tokens as Scanner, but lets one master pattern split
+    # the source into lexemes at C speed and then only classifies each lexeme,
+    # instead of calling advance()/peek() and matching once per character.
+    # Spaces, tabs and carriage returns match nothing and are skipped by
+    # findall itself; newlines come through so lines can be counted.
+
+    pattern = re.compile(r"""
+        [^\W\d]\w*            # identifiers and keywords
+      | //[^\n]*              # comments
+      | != | == | <= | >=
+      | \d+(?:\.\d+)?         # numbers
+      | "[^"]*"?             # strings, without a closing quote when unterminated
+      | \n
+      | [^ \t\r]              # single-character operators and anything unexpected
+    """, re.VERBOSE)
+
+    operators = {
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        "[": TokenType.LEFT_BRACKET,
+        "]": TokenType.RIGHT_BRACKET,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "-": TokenType.MINUS,
+        "+": TokenType.PLUS,
+        ";": TokenType.SEMICOLON,
+        "/": TokenType.SLASH,
+        "*": TokenType.STAR,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+    }
+
+    # Lexemes whose token type is known from the text alone, along with one
+    # copy of the text for all of their tokens to share.
+    fixed = {text: (tokentype, sys.intern(text)) for text, tokentype in {**operators, **Scanner.keywords}.items()}
+
+    def __init__(self, source: str | Iterable[str], reporter: Callable[[int | Token, str], None] = Pylox.error):
+        # Either the whole source, or something yielding it line by line such
+        # as an open file, for stream_tokens().
+        self.source = source
+        self.reporter = reporter
+        self.tokens: list[Token] = []
+        self.line: int = 1
+        self.numbers: dict[str, float] = {}
+
+    def scan_tokens(self) -> list[Token]:
+        # Every token outlives the scan, so running the cyclic collector while
+        # they pile up would only walk them over and over.
+        collecting: bool = gc.isenabled()
+        gc.disable()
+        try:
+            self.scan_lexemes(RegexScanner.pattern.findall(self.source))
+        finally:
+            if collecting:
+                gc.enable()
+
+        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        return self.tokens
+
+    def stream_tokens(self) -> Iterator[Token]:
+        # Scans one line at a time and hands the tokens out as it goes, so only
+        # the current line's tokens are ever held here. Every lexeme but a
+        # string ends before the newline; a string still open at the end of a
+        # line is carried over and scanned again together with the next one.
+        lines: Iterable[str] = io.StringIO(self.source) if isinstance(self.source, str) else self.source
+        findall = RegexScanner.pattern.findall
+        pending: str = ""
+
+        for text in lines:
+            lexemes: list[str] = findall(pending + text if pending else text)
+            pending = ""
+            if lexemes:
+                last: str = lexemes[-1]
+                if last[0] == '"' and (len(last) < 2 or last[-1] != '"'):
+                    pending = lexemes.pop()
+
+            self.tokens = []
+            yield from self.scan_lexemes(lexemes)
+
+        if pending:
+            # Never closed, which scan_lexemes reports.
+            self.tokens = []
+            yield from self.scan_lexemes([pending])
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
+    def scan_lexemes(self, lexemes: list[str]) -> list[Token]:
+        tokens: list[Token] = self.tokens
+        append = tokens.append
+        fixed = RegexScanner.fixed.get
+        intern = sys.intern
+        numbers: dict[str, float] = self.numbers
+        line: int = self.line
+
+        for text in lexemes:
+            kind: tuple[TokenType, str] | None = fixed(text)
+            if kind is not None:
+                append(Token(kind[0], kind[1], None, line))
+                continue
+
+            c: str = text[0]
+            if c == "\n":
+                line += 1
+            elif c == "/":
+                # A lone slash is an operator, so this can only be a comment.
+                pass
+            elif c == '"':
+                line += text.count("\n")
+                if len(text) < 2 or text[-1] != '"':
+                    self.reporter(line, "Unterminated string.")
+                else:
+                    # Like Scanner, a string spanning lines reports the line it ends on.
+                    append(Token(TokenType.STRING, intern(text), intern(text[1:-1]), line))
+            elif c.isdecimal():
+                number: float | None = numbers.get(text)
+                if number is None:
+                    number = numbers[text] = float(text)
+                append(Token(TokenType.NUMBER, intern(text), number, line))
+            elif c == "_" or c.isalnum():
+                append(Token(TokenType.IDENTIFIER, intern(text), None, line))
+            else:
+                self.reporter(line, "Unexpected character.")
+
+        self.line = line
+        return tokens
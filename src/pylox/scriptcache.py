@@ -0,0 +1,81 @@
+import os
+import gc
+import hashlib
+import pickle
+import expr
+import stmt
+from __init__ import Pylox
+
+CACHE_DIRECTORY = "__loxcache__"
+MAGIC = b"PYLOX\0"
+# Bump whenever the pickled shape of the AST or the resolver's tables changes,
+# or the resolver starts rejecting scripts it used to accept.
+CACHE_FORMAT = 7
+
+class ScriptCache:
+    """
+    Keeps the resolved tree of a script in __loxcache__ next to it, much like
+    __pycache__, so running an unchanged script again skips scanning, parsing
+    and resolving and just unpickles the statements and what the resolver
+    found out about them: the locals table and the tail calls.
+    """
+
+    def __init__(self, script_path: str) -> None:
+        directory, filename = os.path.split(os.path.abspath(script_path))
+        stem: str = os.path.splitext(filename)[0]
+        self.directory: str = os.path.join(directory, CACHE_DIRECTORY)
+        self.path: str = os.path.join(self.directory, f"{stem}.pylox-{Pylox.VERSION}.cache")
+
+    @staticmethod
+    def header(source: str) -> bytes:
+        # Optimized and unoptimized trees of the same source differ.
+        key: str = f"{Pylox.VERSION}\0{CACHE_FORMAT}\0{Pylox.optimize}\0{source}"
+        return MAGIC + hashlib.sha256(key.encode("utf-8")).digest()
+
+    def load(self, source: str) -> tuple[list[stmt.Stmt], dict[expr.Expr, tuple[int, int]], dict[stmt.Return, stmt.Function]] | None:
+        try:
+            with open(self.path, "rb") as f:
+                data: bytes = f.read()
+        except OSError:
+            return None
+
+        header: bytes = ScriptCache.header(source)
+        if not data.startswith(header):
+            return None
+
+        # Unpickling creates every node at once, which would otherwise set off
+        # the cyclic collector over and over for no garbage at all. The tree
+        # lives as long as the program does, so it is frozen out of later
+        # collections as well.
+        collecting: bool = gc.isenabled()
+        gc.disable()
+        try:
+            loaded: tuple[list[stmt.Stmt], dict[expr.Expr, tuple[int, int]], dict[stmt.Return, stmt.Function]] = pickle.loads(memoryview(data)[len(header):])
+        except Exception:
+            # A truncated or otherwise unreadable cache is just a miss.
+            return None
+        finally:
+            if collecting:
+                gc.enable()
+
+        gc.freeze()
+        return loaded
+
+    def store(self, source: str, statements: list[stmt.Stmt], resolved: dict[expr.Expr, tuple[int, int]], tail_calls: dict[stmt.Return, stmt.Function]) -> None:
+        # Pickled together so the tables keep pointing at the very same nodes
+        # as the statements once loaded back.
+        try:
+            payload: bytes = pickle.dumps((statements, resolved, tail_calls), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            return None
+
+        temporary: str = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, "wb") as f:
+                f.write(ScriptCache.header(source))
+                f.write(payload)
+            os.replace(temporary, self.path)
+        except OSError:
+            # Read-only locations simply don't get a cache.
+            pass
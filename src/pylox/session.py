@@ -0,0 +1,83 @@
+import stmt
+from __init__ import Pylox
+from scanner import Scanner, RegexScanner
+from parser import Parser
+
+class Session:
+    """
+    An interactive session on one interpreter. Lines are collected until
+    they make up a complete chunk of source, which is then scanned, parsed
+    and resolved on its own with a resolver kept for the whole session, and
+    run. Only the new chunk is ever processed, however much was defined
+    before it.
+
+    Top-level code resolves the same whatever ran before it, since globals
+    are looked up by name, so a chunk entered again, like a definition
+    pasted a second time, runs its already resolved statements straight
+    from the chunk cache.
+    """
+
+    PROMPT = "pylox> "
+    CONTINUATION = "...... "
+
+    def __init__(self) -> None:
+        if Pylox.interpreter is None:
+            Pylox.interpreter = Pylox.create_interpreter()
+        self.resolver: 'Resolver' = Pylox.create_resolver()
+        self.chunks: dict[str, list[stmt.Stmt]] = {}
+        self.lines: list[str] = []
+
+    @property
+    def prompt(self) -> str:
+        return Session.CONTINUATION if self.lines else Session.PROMPT
+
+    def feed(self, line: str) -> bool:
+        # Runs the buffered lines once they are complete, or straight away
+        # on an empty line, and says whether they ran.
+        self.lines.append(line)
+        source: str = "\n".join(self.lines)
+        if line.strip() and not Session.is_complete(source):
+            return False
+
+        self.lines.clear()
+        self.run(source)
+        return True
+
+    @staticmethod
+    def is_complete(source: str) -> bool:
+        # Open parentheses, braces or brackets, or a string still missing its
+        # closing quote, mean there is more to come.
+        depth: int = 0
+        for lexeme in RegexScanner.pattern.findall(source):
+            if lexeme in ("(", "{", "["):
+                depth += 1
+            elif lexeme in (")", "}", "]"):
+                depth -= 1
+            elif lexeme[0] == '"' and (len(lexeme) == 1 or lexeme[-1] != '"'):
+                return False
+        return depth <= 0
+
+    def run(self, source: str) -> None:
+        statements: list[stmt.Stmt] | None = self.compile(source.strip())
+        if statements is not None:
+            Pylox.execute(statements)
+        Pylox.had_error = False
+
+    def compile(self, source: str) -> list[stmt.Stmt] | None:
+        statements: list[stmt.Stmt] | None = self.chunks.get(source)
+        if statements is not None:
+            return statements
+
+        scanner: Scanner | RegexScanner = RegexScanner(source) if Pylox.scanner == "regex" else Scanner(source)
+        statements = Parser(scanner.scan_tokens()).parse()
+        if Pylox.had_error:
+            return None
+
+        statements = Pylox.optimize_tree(statements)
+        for statement in statements:
+            self.resolver.resolve(statement)
+        if Pylox.had_error:
+            return None
+
+        self.chunks[source] = statements
+        return statements
@@ -0,0 +1,373 @@
+import expr
+import stmt
+from token import TokenType
+from types import GeneratorType
+from typing import Callable, Generator
+import runtimeerror
+from completion import RETURN
+from environment import Environment
+import loxcallable
+import natives
+from loxarray import LoxArray
+from interpreter import Interpreter
+from resolver import Resolver, FunctionType
+
+# A visit method that needs its children visited first is a generator: it
+# yields each child node and is sent back whatever visiting that child
+# returned, and its own result is the value it finally returns. Leaves, and
+# anything else that never has to wait on a child, stay ordinary methods.
+Visit = Generator[expr.Expr | stmt.Stmt, object, object]
+
+# Most Lox calls that can be in progress at once, the same as the VM allows.
+# Calls don't grow the Python stack here, so nothing else would stop runaway
+# recursion before memory runs out.
+FRAMES_MAX = 1 << 18
+
+def drive(handlers: dict[type, Callable], visit: Visit) -> object:
+    """
+    Runs a generator visit method to completion with a list standing in for
+    the Python stack, so a tree of any depth is walked from this one frame.
+    """
+    stack: list[Visit] = [visit]
+    push = stack.append
+    value: object = None
+
+    try:
+        while True:
+            try:
+                child: expr.Expr | stmt.Stmt = stack[-1].send(value)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                value = done.value
+                continue
+
+            value = handlers[type(child)](child)
+            if type(value) is GeneratorType:
+                push(value)
+                value = None
+    except BaseException:
+        # Let every suspended visit run its finally clauses, innermost first,
+        # just like the frames of the recursive visitors would unwind.
+        for visit in reversed(stack):
+            visit.close()
+        raise
+
+def run(handlers: dict[type, Callable], node: expr.Expr | stmt.Stmt) -> object:
+    result: object = handlers[type(node)](node)
+    if type(result) is GeneratorType:
+        return drive(handlers, result)
+    return result
+
+class StackInterpreter(Interpreter):
+    """
+    The tree-walking Interpreter, with every visit that evaluates a child
+    rewritten as a generator for drive(). Neither deeply nested expressions
+    nor calls between Lox functions grow the Python stack, so neither runs
+    into the recursion limit.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Lox function bodies running on the machine.
+        self.depth: int = 0
+
+    def evaluate(self, expression: expr.Expr) -> object:
+        return run(self.handlers, expression)
+
+    def execute(self, statement: stmt.Stmt) -> object:
+        return run(self.handlers, statement)
+
+    def execute_block(self, statements: list[stmt.Stmt], environment: Environment) -> object:
+        # Only reached from outside the machine, e.g. a native calling back
+        # into a Lox function.
+        return drive(self.handlers, self.run_block(statements, environment))
+
+    def run_block(self, statements: list[stmt.Stmt], environment: Environment) -> Visit:
+        previous: Environment = self.environment
+        try:
+            self.environment = environment
+            for statement in statements:
+                if (yield statement) is RETURN:
+                    return RETURN
+        finally:
+            self.environment = previous
+        return None
+
+    def visit_block_stmt(self, statement: stmt.Block) -> Visit:
+        return self.run_block(statement.statements, Environment(self.environment))
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> Visit:
+        yield statement.expression
+        return None
+
+    def visit_if_stmt(self, statement: stmt.If) -> Visit:
+        if self.is_truthy((yield statement.condition)):
+            return (yield statement.then_branch)
+        elif statement.else_branch is not None:
+            return (yield statement.else_branch)
+
+        return None
+
+    def visit_print_stmt(self, statement: stmt.Print) -> Visit:
+        value: object = yield statement.expression
+        self.output.write(self.stringify(value) + "\n")
+        return None
+
+    def visit_return_stmt(self, statement: stmt.Return) -> Visit:
+        function: stmt.Function | None = self.tail_calls.get(statement)
+        if function is not None:
+            call: expr.Call = statement.value
+            callee: object = yield call.callee
+            if type(callee) is self.function_class and callee.declaration is function:
+                arguments: list[object] = []
+                for argument in call.arguments:
+                    arguments.append((yield argument))
+                if len(arguments) != callee.param_count:
+                    raise runtimeerror.RuntimeError(call.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+                self.tail_call = (callee, arguments)
+                return RETURN
+
+        value: object = None
+        if statement.value is not None:
+            value = yield statement.value
+
+        self.return_value = value
+        return RETURN
+
+    def visit_var_stmt(self, statement: stmt.Var) -> Visit:
+        value: object = None
+        if statement.initializer is not None:
+            value = yield statement.initializer
+
+        self.define(statement.name.lexeme, value)
+        return None
+
+    def visit_while_stmt(self, statement: stmt.While) -> Visit:
+        while self.is_truthy((yield statement.condition)):
+            if (yield statement.body) is RETURN:
+                return RETURN
+        return None
+
+    def visit_assign_expr(self, expression: expr.Assign) -> Visit:
+        value: object = yield expression.value
+        return self.assign_variable(expression.name, expression, value)
+
+    def visit_binary_expr(self, expression: expr.Binary) -> Visit:
+        left: object = yield expression.left
+        right: object = yield expression.right
+        return self.binary(expression.operator, left, right)
+
+    def visit_call_expr(self, expression: expr.Call) -> Visit:
+        callee: object = yield expression.callee
+        arguments: list[object] = []
+        for argument in expression.arguments:
+            arguments.append((yield argument))
+
+        if type(callee) is self.function_class:
+            # The body runs on the machine too, so Lox recursion is bounded by
+            # FRAMES_MAX rather than by the recursion limit.
+            if len(arguments) != callee.param_count:
+                raise runtimeerror.RuntimeError(expression.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+            if self.depth >= FRAMES_MAX:
+                raise runtimeerror.RuntimeError(expression.paren, "Stack overflow.")
+
+            previous: Environment = self.environment
+            self.depth += 1
+            try:
+                while True:
+                    self.environment = Environment(callee.closure, arguments)
+                    for statement in callee.body:
+                        if (yield statement) is RETURN:
+                            break
+                    else:
+                        return None
+
+                    if self.tail_call is None:
+                        return self.return_value
+                    callee, arguments = self.tail_call
+                    self.tail_call = None
+            finally:
+                self.environment = previous
+                self.depth -= 1
+
+        if type(callee) is natives.Native:
+            if len(arguments) != callee.param_count:
+                raise runtimeerror.RuntimeError(expression.paren, f"Expected {callee.param_count} arguments but got {len(arguments)}")
+            try:
+                return callee.function(*arguments)
+            except natives.NativeError as error:
+                raise runtimeerror.RuntimeError(expression.paren, error.message) from None
+
+        if not isinstance(callee, loxcallable.LoxCallable):
+            raise runtimeerror.RuntimeError(expression.paren, "Can only call functions and classes.")
+
+        function: loxcallable.LoxCallable = callee
+        if len(arguments) != function.arity():
+            raise runtimeerror.RuntimeError(expression.paren, f"Expected {function.arity()} arguments but got {len(arguments)}")
+        try:
+            return function.call(self, arguments)
+        except natives.NativeError as error:
+            raise runtimeerror.RuntimeError(expression.paren, error.message) from None
+
+    def visit_array_expr(self, expression: expr.Array) -> Visit:
+        elements: list[object] = []
+        for element in expression.elements:
+            elements.append((yield element))
+        return LoxArray.of(elements)
+
+    def visit_index_expr(self, expression: expr.Index) -> Visit:
+        sequence: object = yield expression.sequence
+        index: object = yield expression.index
+        return self.index(expression.bracket, sequence, index)
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> Visit:
+        sequence: object = yield expression.sequence
+        index: object = yield expression.index
+        value: object = yield expression.value
+        return self.set_index(expression.bracket, sequence, index, value)
+
+    def visit_grouping_expr(self, expression: expr.Grouping) -> Visit:
+        return (yield expression.expression)
+
+    def visit_logical_expr(self, expression: expr.Logical) -> Visit:
+        left: object = yield expression.left
+
+        if expression.operator.tokentype == TokenType.OR:
+            if self.is_truthy(left):
+                return left
+        else:
+            if not self.is_truthy(left):
+                return left
+
+        return (yield expression.right)
+
+    def visit_unary_expr(self, expression: expr.Unary) -> Visit:
+        right: object = yield expression.right
+        return self.unary(expression.operator, right)
+
+class StackResolver(Resolver):
+    """
+    The Resolver, driven the same way as the StackInterpreter so trees too
+    deep for the recursive one still resolve.
+    """
+
+    def resolve(self, statement: list[stmt.Stmt] | stmt.Stmt | expr.Expr) -> None:
+        handlers = self.handlers
+        if isinstance(statement, list):
+            for inner in statement:
+                run(handlers, inner)
+            return None
+        run(handlers, statement)
+
+    def visit_block_stmt(self, statement: stmt.Block) -> Visit:
+        self.begin_scope()
+        for inner in statement.statements:
+            yield inner
+        self.end_scope()
+        return None
+
+    def visit_expression_stmt(self, statement: stmt.Expression) -> Visit:
+        yield statement.expression
+        return None
+
+    def visit_function_stmt(self, statement: stmt.Function) -> Visit:
+        self.declare(statement.name)
+        self.define(statement.name)
+
+        enclosing_function: FunctionType = self.current_function
+        self.current_function = FunctionType.FUNCTION
+        enclosing_declaration: stmt.Function | None = self.current_declaration
+        self.current_declaration = statement
+        self.begin_scope()
+
+        for param in statement.params:
+            self.declare(param)
+            self.define(param)
+
+        for inner in statement.body:
+            yield inner
+        self.end_scope()
+        self.current_declaration = enclosing_declaration
+        self.current_function = enclosing_function
+        return None
+
+    def visit_if_stmt(self, statement: stmt.If) -> Visit:
+        yield statement.condition
+        yield statement.then_branch
+        if not statement.else_branch is None:
+            yield statement.else_branch
+        return None
+
+    def visit_print_stmt(self, statement: stmt.Print) -> Visit:
+        yield statement.expression
+        return None
+
+    def visit_return_stmt(self, statement: stmt.Return) -> Visit:
+        if self.current_function == FunctionType.NONE:
+            self.report(statement.keyword, "Can't return from top-level code.")
+
+        if not statement.value is None:
+            yield statement.value
+            self.resolve_tail_call(statement)
+        return None
+
+    def visit_var_stmt(self, statement: stmt.Var) -> Visit:
+        self.declare(statement.name)
+        if statement.initializer is not None:
+            yield statement.initializer
+        self.define(statement.name)
+        return None
+
+    def visit_while_stmt(self, statement: stmt.While) -> Visit:
+        yield statement.condition
+        yield statement.body
+        return None
+
+    def visit_assign_expr(self, expression: expr.Assign) -> Visit:
+        yield expression.value
+        self.resolve_local(expression, expression.name)
+        return None
+
+    def visit_binary_expr(self, expression: expr.Binary) -> Visit:
+        yield expression.left
+        yield expression.right
+        return None
+
+    def visit_call_expr(self, expression: expr.Call) -> Visit:
+        yield expression.callee
+
+        for argument in expression.arguments:
+            yield argument
+
+        return None
+
+    def visit_array_expr(self, expression: expr.Array) -> Visit:
+        for element in expression.elements:
+            yield element
+        return None
+
+    def visit_index_expr(self, expression: expr.Index) -> Visit:
+        yield expression.sequence
+        yield expression.index
+        return None
+
+    def visit_setindex_expr(self, expression: expr.SetIndex) -> Visit:
+        yield expression.sequence
+        yield expression.index
+        yield expression.value
+        return None
+
+    def visit_grouping_expr(self, expression: expr.Grouping) -> Visit:
+        yield expression.expression
+        return None
+
+    def visit_logical_expr(self, expression: expr.Logical) -> Visit:
+        yield expression.left
+        yield expression.right
+        return None
+
+    def visit_unary_expr(self, expression: expr.Unary) -> Visit:
+        yield expression.right
+        return None
@@ -0,0 +1,22 @@
+import os
+import sys
+import importlib
+
+def import_stdlib(*names: str) -> None:
+    # Some standard library modules, like traceback and asyncio, pull in
+    # tokenize, which needs the standard library's token module rather than
+    # ours. Import them with ours out of the way; they keep the one they got,
+    # and everything else goes on importing ours.
+    here: str = os.path.dirname(os.path.abspath(__file__))
+    ours = sys.modules.pop("token", None)
+    path: list[str] = sys.path[:]
+    sys.path[:] = [entry for entry in path if os.path.abspath(entry) != here]
+    try:
+        for name in names:
+            importlib.import_module(name)
+    finally:
+        sys.path[:] = path
+        if ours is not None:
+            sys.modules["token"] = ours
+        else:
+            sys.modules.pop("token", None)
@@ -3,81 +3,161 @@ from token import Token
 
 class Stmt(ABC):
 
+    # Fields are set once, by __init__, and never change afterwards.
+    __slots__ = ()
+
+    # Position of the node class in KINDS and the name of its Visitor method.
+    KIND: int
+    VISIT: str
+
     @abstractmethod
     def accept(self, visitor: 'Visitor') -> None:
         raise NotImplementedError
 
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __reduce__(self) -> tuple:
+        # Pickle would restore the slots with setattr, so go through __init__.
+        return (type(self), tuple(getattr(self, field) for field in self.__slots__))
+
 class Block(Stmt):
 
+    __slots__ = ('statements',)
+    KIND = 0
+    VISIT = "visit_block_stmt"
+
+    statements: 'list[Stmt]'
+
     def __init__(self, statements: 'list[Stmt]') -> None:
-        self.statements: 'list[Stmt]' = statements
+        object.__setattr__(self, "statements", statements)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_block_stmt(self)
 
 class Expression(Stmt):
 
+    __slots__ = ('expression',)
+    KIND = 1
+    VISIT = "visit_expression_stmt"
+
+    expression: 'Expr'
+
     def __init__(self, expression: 'Expr') -> None:
-        self.expression: 'Expr' = expression
+        object.__setattr__(self, "expression", expression)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_expression_stmt(self)
 
 class Function(Stmt):
 
+    __slots__ = ('name', 'params', 'body')
+    KIND = 2
+    VISIT = "visit_function_stmt"
+
+    name: Token
+    params: 'list[Token]'
+    body: 'list[Stmt]'
+
     def __init__(self, name: Token, params: 'list[Token]', body: 'list[Stmt]') -> None:
-        self.name: Token = name
-        self.params: 'list[Token]' = params
-        self.body: 'list[Stmt]' = body
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "params", params)
+        object.__setattr__(self, "body", body)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_function_stmt(self)
 
 class If(Stmt):
 
-    def __init__(self, condition: 'Expr', then_branch: 'Stmt', else_branch: 'Stmt') -> None:
-        self.condition: 'Expr' = condition
-        self.then_branch: 'Stmt' = then_branch
-        self.else_branch: 'Stmt' = else_branch
+    __slots__ = ('keyword', 'condition', 'then_branch', 'else_branch')
+    KIND = 3
+    VISIT = "visit_if_stmt"
+
+    keyword: Token
+    condition: 'Expr'
+    then_branch: 'Stmt'
+    else_branch: 'Stmt'
+
+    def __init__(self, keyword: Token, condition: 'Expr', then_branch: 'Stmt', else_branch: 'Stmt') -> None:
+        object.__setattr__(self, "keyword", keyword)
+        object.__setattr__(self, "condition", condition)
+        object.__setattr__(self, "then_branch", then_branch)
+        object.__setattr__(self, "else_branch", else_branch)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_if_stmt(self)
 
 class Print(Stmt):
 
-    def __init__(self, expression: 'Expr') -> None:
-        self.expression: 'Expr' = expression
+    __slots__ = ('keyword', 'expression')
+    KIND = 4
+    VISIT = "visit_print_stmt"
+
+    keyword: Token
+    expression: 'Expr'
+
+    def __init__(self, keyword: Token, expression: 'Expr') -> None:
+        object.__setattr__(self, "keyword", keyword)
+        object.__setattr__(self, "expression", expression)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_print_stmt(self)
 
 class Return(Stmt):
 
+    __slots__ = ('keyword', 'value')
+    KIND = 5
+    VISIT = "visit_return_stmt"
+
+    keyword: Token
+    value: 'Expr'
+
     def __init__(self, keyword: Token, value: 'Expr') -> None:
-        self.keyword: Token = keyword
-        self.value: 'Expr' = value
+        object.__setattr__(self, "keyword", keyword)
+        object.__setattr__(self, "value", value)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_return_stmt(self)
 
 class Var(Stmt):
 
+    __slots__ = ('name', 'initializer')
+    KIND = 6
+    VISIT = "visit_var_stmt"
+
+    name: Token
+    initializer: 'Expr'
+
     def __init__(self, name: Token, initializer: 'Expr') -> None:
-        self.name: Token = name
-        self.initializer: 'Expr' = initializer
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "initializer", initializer)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_var_stmt(self)
 
 class While(Stmt):
 
-    def __init__(self, condition: 'Expr', body: 'Stmt') -> None:
-        self.condition: 'Expr' = condition
-        self.body: 'Stmt' = body
+    __slots__ = ('keyword', 'condition', 'body')
+    KIND = 7
+    VISIT = "visit_while_stmt"
+
+    keyword: Token
+    condition: 'Expr'
+    body: 'Stmt'
+
+    def __init__(self, keyword: Token, condition: 'Expr', body: 'Stmt') -> None:
+        object.__setattr__(self, "keyword", keyword)
+        object.__setattr__(self, "condition", condition)
+        object.__setattr__(self, "body", body)
 
     def accept(self, visitor: 'Visitor') -> None:
         return visitor.visit_while_stmt(self)
 
+KINDS: tuple[type[Stmt], ...] = (Block, Expression, Function, If, Print, Return, Var, While)
+
 class Visitor(ABC):
 
     @abstractmethod
@@ -2,7 +2,7 @@ from enum import Enum
 
 tokens_desc = """
 // Single-character tokens.
-LEFT_PAREN, RIGHT_PAREN, LEFT_BRACE, RIGHT_BRACE,
+LEFT_PAREN, RIGHT_PAREN, LEFT_BRACE, RIGHT_BRACE, LEFT_BRACKET, RIGHT_BRACKET,
 COMMA, DOT, MINUS, PLUS, SEMICOLON, SLASH, STAR,
 
 // One or two character tokens.
@@ -26,6 +26,11 @@ TOKENS = [ token.strip() for token in "".join(line for line in tokens_desc.split
 TokenType = Enum("TokenType", TOKENS)
 
 class Token:
+    # Large sources produce millions of these, so no per-instance __dict__.
+    # The scanners intern lexemes and share number literals, so repeated
+    # names and numbers cost one string or float between them.
+
+    __slots__ = ("tokentype", "lexeme", "literal", "line")
 
     def __init__(self, ttype: TokenType, lexeme: str, literal: object, line: int):
         self.tokentype, self.lexeme, self.literal, self.line = ttype, lexeme, literal, line
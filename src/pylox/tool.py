@@ -10,16 +10,21 @@ class GenerateAst():
     
     @staticmethod
     def main(args: list[str]) -> None:
+        # Every node is tagged with its KIND and the name of its visitor
+        # method, which dispatch.py builds its tables from. --slots also makes
+        # them slotted and immutable; without it, they are plain classes.
+        slots: bool = "--slots" in args
+        args = [arg for arg in args if arg != "--slots"]
         if len(args) != 1:
-            print("Usage: generate_ast <output directory>", file = sys.stderr)
+            print("Usage: generate_ast [--slots] <output directory>", file = sys.stderr)
             sys.exit(64)
         output_dir: str = args[0]
         
         for basename, types in GRAMMAR:
-            GenerateAst.define_ast(output_dir, basename, types)
+            GenerateAst.define_ast(output_dir, basename, types, slots)
     
     @staticmethod
-    def define_ast(output_dir: str, basename: str, types: tuple) -> None:
+    def define_ast(output_dir: str, basename: str, types: tuple, slots: bool = False) -> None:
         path = os.path.join(output_dir, f"{basename.lower()}.py")
         
         with open(path, "w") as f:
@@ -28,18 +33,51 @@ class GenerateAst():
               "from token import Token",
               "", 
               f"class {basename}(ABC):",
-              "",
+              ""])
+
+            if slots:
+                src += '\n' + '\n'.join([
+                  "    # Fields are set once, by __init__, and never change afterwards.",
+                  "    __slots__ = ()",
+                  ""])
+
+            src += '\n' + '\n'.join([
+              "    # Position of the node class in KINDS and the name of its Visitor method.",
+              "    KIND: int",
+              "    VISIT: str",
+              ""])
+
+            src += '\n' + '\n'.join([
               "    @abstractmethod",
               "    def accept(self, visitor: 'Visitor') -> None:",
               "        raise NotImplementedError",
               ""])
+
+            if slots:
+                src += '\n' + '\n'.join([
+                  "    def __setattr__(self, name: str, value: object) -> None:",
+                  "        raise AttributeError(f\"{type(self).__name__} nodes are immutable\")",
+                  "",
+                  "    def __delattr__(self, name: str) -> None:",
+                  "        raise AttributeError(f\"{type(self).__name__} nodes are immutable\")",
+                  "",
+                  "    def __reduce__(self) -> tuple:",
+                  "        # Pickle would restore the slots with setattr, so go through __init__.",
+                  "        return (type(self), tuple(getattr(self, field) for field in self.__slots__))",
+                  ""])
             
             print(src, file=f)
 
-            for atype in types:
+            for kind, atype in enumerate(types):
                 class_name = atype[0]
                 fieldspec = atype[1:]
-                GenerateAst.define_type(f, basename, class_name, fieldspec)
+                if slots:
+                    GenerateAst.define_slotted_type(f, basename, class_name, fieldspec, kind)
+                else:
+                    GenerateAst.define_type(f, basename, class_name, fieldspec, kind)
+
+            print(f"KINDS: tuple[type[{basename}], ...] = ({', '.join(atype[0] for atype in types)})", file=f)
+            print("", file=f)
 
             GenerateAst.define_visitor(f, basename, types)
     
@@ -57,9 +95,12 @@ class GenerateAst():
         print("",file=writer)
 
     @staticmethod
-    def define_type(writer: TextIO, basename: str, class_name: str, fieldspec: tuple) -> None:
+    def define_type(writer: TextIO, basename: str, class_name: str, fieldspec: tuple, kind: int) -> None:
         print(f"class {class_name}({basename}):", file=writer)
         print("", file=writer)
+        print(f"    KIND = {kind}", file=writer)
+        print(f"    VISIT = \"visit_{class_name.lower()}_{basename.lower()}\"", file=writer)
+        print("", file=writer)
         
         # Build the constructor parameters
         param_strs = []
@@ -83,5 +124,31 @@ class GenerateAst():
         print(f"        return visitor.visit_{class_name.lower()}_{basename.lower()}(self)", file=writer)
         print("", file=writer)
 
+    @staticmethod
+    def define_slotted_type(writer: TextIO, basename: str, class_name: str, fieldspec: tuple, kind: int) -> None:
+        print(f"class {class_name}({basename}):", file=writer)
+        print("", file=writer)
+        print(f"    __slots__ = {tuple(field_name for field_name, _ in fieldspec)!r}", file=writer)
+        print(f"    KIND = {kind}", file=writer)
+        print(f"    VISIT = \"visit_{class_name.lower()}_{basename.lower()}\"", file=writer)
+        print("", file=writer)
+
+        # Class-level annotations only, since the values live in the slots.
+        param_strs = []
+        for field_name, field_type in fieldspec:
+            annotation = field_type if field_type in ['Token', 'object'] else f"'{field_type}'"
+            print(f"    {field_name}: {annotation}", file=writer)
+            param_strs.append(f"{field_name}: {annotation}")
+        print("", file=writer)
+
+        print(f"    def __init__(self, {', '.join(param_strs)}) -> None:", file=writer)
+        for field_name, _ in fieldspec:
+            print(f"        object.__setattr__(self, \"{field_name}\", {field_name})", file=writer)
+
+        print("", file=writer)
+        print("    def accept(self, visitor: 'Visitor') -> None:", file=writer)
+        print(f"        return visitor.visit_{class_name.lower()}_{basename.lower()}(self)", file=writer)
+        print("", file=writer)
+
 if __name__ == '__main__':
-    GenerateAst.main(["./"])
\ No newline at end of file
+    GenerateAst.main(sys.argv[1:] or ["./"])
\ No newline at end of file
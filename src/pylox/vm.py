@@ -0,0 +1,301 @@
+from types import SimpleNamespace
+from token import Token, TokenType
+from __init__ import Pylox
+import runtimeerror
+from environment import Environment, UNDEFINED
+from chunk import Chunk, FunctionProto, OpCode
+import loxcallable
+from natives import Native, NativeError
+from loxarray import LoxArray
+
+# Most Lox calls that can be in progress at once. Frames live in a list rather
+# than on Python's stack, so without a limit runaway recursion only stops when
+# memory runs out.
+FRAMES_MAX = 1 << 18
+
+# The int behind every opcode, for run() to copy into locals each time it
+# starts without going through the enum, which costs more than a short
+# script takes to run.
+OP = SimpleNamespace(**{opcode.name: opcode.value for opcode in OpCode})
+
+class VMFunction(loxcallable.LoxCallable):
+
+    def __init__(self, proto: FunctionProto, closure: Environment) -> None:
+        self.proto = proto
+        self.closure = closure
+
+    def arity(self) -> int:
+        return self.proto.arity
+
+    def call(self, interpreter: 'Interpreter', arguments: list[object]) -> object:
+        # Only reached when something other than the VM calls us, e.g. a native
+        # function. Calls between VM functions never leave the dispatch loop.
+        return VM(interpreter).run(self.proto.chunk, Environment(self.closure, arguments))
+
+    def __str__(self):
+        return f"<fn {self.proto.name}>"
+
+class VM:
+
+    def __init__(self, interpreter: 'Interpreter') -> None:
+        self.interpreter = interpreter
+        self.globals = interpreter.globals
+
+    def interpret(self, script: FunctionProto) -> None:
+        try:
+            self.run(script.chunk, self.globals)
+        except runtimeerror.RuntimeError as error:
+            Pylox.runtime_error(error)
+
+    @staticmethod
+    def error(chunk: Chunk, ip: int, message: str) -> runtimeerror.RuntimeError:
+        # Bytecode doesn't keep tokens around, only the line table.
+        line: int = chunk.get_line(ip - 1)
+        return runtimeerror.RuntimeError(Token(TokenType.EOF, "", None, line), message)
+
+    def global_name(self, slot: int) -> str:
+        # Only needed for error messages, so a scan is fine.
+        return next(name for name, index in self.globals.names.items() if index == slot)
+
+    def run(self, chunk: Chunk, environment: Environment) -> object:
+        # Opcodes as locals, ordered roughly by how often they show up in hot
+        # loops, so the dispatch chain stays short for the common cases.
+        GET_LOCAL, GET_ENCLOSING, GET_GLOBAL = OP.GET_LOCAL, OP.GET_ENCLOSING, OP.GET_GLOBAL
+        CONSTANT, POP, JUMP_IF_FALSE, JUMP, LOOP = OP.CONSTANT, OP.POP, OP.JUMP_IF_FALSE, OP.JUMP, OP.LOOP
+        ADD, SUBTRACT, MULTIPLY, DIVIDE = OP.ADD, OP.SUBTRACT, OP.MULTIPLY, OP.DIVIDE
+        LESS, LESS_EQUAL, GREATER, GREATER_EQUAL = OP.LESS, OP.LESS_EQUAL, OP.GREATER, OP.GREATER_EQUAL
+        EQUAL, NOT_EQUAL, NOT, NEGATE = OP.EQUAL, OP.NOT_EQUAL, OP.NOT, OP.NEGATE
+        SET_LOCAL, SET_ENCLOSING, SET_GLOBAL = OP.SET_LOCAL, OP.SET_ENCLOSING, OP.SET_GLOBAL
+        DEFINE_LOCAL, DEFINE_GLOBAL = OP.DEFINE_LOCAL, OP.DEFINE_GLOBAL
+        CALL, RETURN, CLOSURE = OP.CALL, OP.RETURN, OP.CLOSURE
+        PUSH_SCOPE, POP_SCOPE, PRINT = OP.PUSH_SCOPE, OP.POP_SCOPE, OP.PRINT
+        NIL, TRUE, FALSE = OP.NIL, OP.TRUE, OP.FALSE
+        ARRAY, GET_INDEX, SET_INDEX = OP.ARRAY, OP.GET_INDEX, OP.SET_INDEX
+
+        interpreter: 'Interpreter' = self.interpreter
+        global_slots: list[object] = self.globals.slots
+        stringify = interpreter.stringify
+        write = interpreter.output.write
+        LoxCallable = loxcallable.LoxCallable
+
+        stack: list[object] = []
+        push = stack.append
+        pop = stack.pop
+        # Callers suspended by CALL, as (chunk, ip, environment).
+        frames: list[tuple[Chunk, int, Environment]] = []
+
+        code = chunk.code
+        constants: list[object] = chunk.constants
+        ip: int = 0
+
+        while True:
+            op: int = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(environment.slots[code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[(code[ip] << 8) | code[ip + 1]])
+                ip += 2
+            elif op == JUMP_IF_FALSE:
+                value: object = stack[-1]
+                if value is None or value is False:
+                    ip += (code[ip] << 8) | code[ip + 1]
+                ip += 2
+            elif op == POP:
+                pop()
+            elif op == LESS:
+                b: object = pop()
+                a: object = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a < b)
+            elif op == ADD:
+                b = pop()
+                a = pop()
+                if (type(a) is float and type(b) is float) or (type(a) is str and type(b) is str):
+                    push(a + b)
+                else:
+                    raise VM.error(chunk, ip, "Operands must be two numbers or two strings.")
+            elif op == SUBTRACT:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a - b)
+            elif op == GET_ENCLOSING:
+                frame: Environment = environment
+                for _ in range(code[ip]):
+                    frame = frame.enclosing
+                push(frame.slots[code[ip + 1]])
+                ip += 2
+            elif op == GET_GLOBAL:
+                slot: int = (code[ip] << 8) | code[ip + 1]
+                ip += 2
+                value = global_slots[slot]
+                if value is UNDEFINED:
+                    raise VM.error(chunk, ip, f"Undefined variable '{self.global_name(slot)}'.")
+                push(value)
+            elif op == SET_LOCAL:
+                environment.slots[code[ip]] = stack[-1]
+                ip += 1
+            elif op == LOOP:
+                ip -= ((code[ip] << 8) | code[ip + 1]) - 2
+            elif op == JUMP:
+                ip += ((code[ip] << 8) | code[ip + 1]) + 2
+            elif op == CALL:
+                count: int = code[ip]
+                ip += 1
+                callee: object = stack[-count - 1]
+                arguments: list[object] = stack[len(stack) - count:]
+                del stack[len(stack) - count - 1:]
+
+                if type(callee) is VMFunction:
+                    if count != callee.proto.arity:
+                        raise VM.error(chunk, ip, f"Expected {callee.proto.arity} arguments but got {count}")
+                    if len(frames) >= FRAMES_MAX:
+                        raise VM.error(chunk, ip, "Stack overflow.")
+                    frames.append((chunk, ip, environment))
+                    chunk = callee.proto.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    ip = 0
+                    environment = Environment(callee.closure, arguments)
+                elif type(callee) is Native:
+                    if count != callee.param_count:
+                        raise VM.error(chunk, ip, f"Expected {callee.param_count} arguments but got {count}")
+                    try:
+                        push(callee.function(*arguments))
+                    except NativeError as error:
+                        raise VM.error(chunk, ip, error.message) from None
+                elif isinstance(callee, LoxCallable):
+                    if count != callee.arity():
+                        raise VM.error(chunk, ip, f"Expected {callee.arity()} arguments but got {count}")
+                    try:
+                        push(callee.call(interpreter, arguments))
+                    except NativeError as error:
+                        raise VM.error(chunk, ip, error.message) from None
+                else:
+                    raise VM.error(chunk, ip, "Can only call functions and classes.")
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+                chunk, ip, environment = frames.pop()
+                code = chunk.code
+                constants = chunk.constants
+            elif op == MULTIPLY:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a * b)
+            elif op == DIVIDE:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                if b == 0.0:
+                    raise VM.error(chunk, ip, "Division by zero.")
+                push(a / b)
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a <= b)
+            elif op == GREATER:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a > b)
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    raise VM.error(chunk, ip, "Operands must be numbers.")
+                push(a >= b)
+            elif op == EQUAL:
+                b = pop()
+                push(pop() == b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                push(pop() != b)
+            elif op == NOT:
+                value = pop()
+                push(value is None or value is False)
+            elif op == NEGATE:
+                value = pop()
+                if type(value) is not float:
+                    raise VM.error(chunk, ip, "Operand must be a number.")
+                push(-value)
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == DEFINE_LOCAL:
+                environment.slots.append(pop())
+            elif op == SET_ENCLOSING:
+                frame = environment
+                for _ in range(code[ip]):
+                    frame = frame.enclosing
+                frame.slots[code[ip + 1]] = stack[-1]
+                ip += 2
+            elif op == SET_GLOBAL:
+                slot = (code[ip] << 8) | code[ip + 1]
+                ip += 2
+                if global_slots[slot] is UNDEFINED:
+                    raise VM.error(chunk, ip, f"Undefined variable '{self.global_name(slot)}'.")
+                global_slots[slot] = stack[-1]
+            elif op == DEFINE_GLOBAL:
+                global_slots[(code[ip] << 8) | code[ip + 1]] = pop()
+                ip += 2
+            elif op == PUSH_SCOPE:
+                environment = Environment(environment)
+            elif op == POP_SCOPE:
+                environment = environment.enclosing
+            elif op == CLOSURE:
+                push(VMFunction(constants[(code[ip] << 8) | code[ip + 1]], environment))
+                ip += 2
+            elif op == PRINT:
+                write(stringify(pop()) + "\n")
+            elif op == ARRAY:
+                count = (code[ip] << 8) | code[ip + 1]
+                ip += 2
+                array: LoxArray = LoxArray.of(stack[len(stack) - count:])
+                del stack[len(stack) - count:]
+                push(array)
+            elif op == GET_INDEX:
+                index: object = pop()
+                sequence: object = pop()
+                if type(sequence) is LoxArray and type(index) is float:
+                    elements = sequence.elements
+                    slot = int(index)
+                    if slot == index and 0 <= slot < len(elements):
+                        push(elements[slot])
+                        continue
+                try:
+                    push(interpreter.index(None, sequence, index))
+                except runtimeerror.RuntimeError as error:
+                    # Interpreter.index() has no token to blame here.
+                    raise VM.error(chunk, ip, error.message) from None
+            elif op == SET_INDEX:
+                value = pop()
+                index = pop()
+                sequence = pop()
+                if type(sequence) is LoxArray and type(index) is float and (type(value) is float or type(sequence.elements) is list):
+                    elements = sequence.elements
+                    slot = int(index)
+                    if slot == index and 0 <= slot < len(elements):
+                        elements[slot] = value
+                        push(value)
+                        continue
+                try:
+                    push(interpreter.set_index(None, sequence, index, value))
+                except runtimeerror.RuntimeError as error:
+                    raise VM.error(chunk, ip, error.message) from None
+            else:
+                raise VM.error(chunk, ip, f"Unknown opcode {op}.")
@@ -0,0 +1,236 @@
+"""
+Every engine, with or without the optimizer, with either scanner and
+streamed or not, has to print the same and fail the same on the same
+script. So does a Session fed the script line by line, and a Program
+compiled from it.
+"""
+import subprocess
+import sys
+
+import pytest
+
+from test_scripts import ENGINES, PYLOX, run
+
+# Each engine as it runs by default, then the optimizer, the book's scanner
+# and streaming each turned on or off on the tree-walker and on the VM, which
+# compiles the tree differently from everything else.
+CONFIGURATIONS = [
+    *[(f"--engine={engine}",) for engine in ENGINES],
+    *[(f"--engine={engine}", option) for engine in ("tree", "vm") for option in ("--no-optimize", "--scanner=book", "--stream")],
+]
+
+CLOSURES = """fun counter() {
+  var count = 0;
+  fun increment() {
+    count = count + 1;
+    return count;
+  }
+  return increment;
+}
+var a = counter();
+var b = counter();
+print a();
+print a();
+print b();
+var x = "global";
+{
+  fun show() { print x; }
+  show();
+  var x = "block";
+  show();
+  print x;
+}
+fun sum(n, acc) {
+  if (n == 0) return acc;
+  return sum(n - 1, acc + n);
+}
+print sum(10000, 0);
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+print fib(15);
+print clock;
+print counter;
+"""
+
+VALUES = """print 1 + 2 * 3 - 4 / 8;
+print -(3) - -2;
+print 7 / 2;
+print 0.1 + 0.2;
+print "a" + "b" + "c";
+print "abc" == "abc";
+print nil == nil;
+print nil == false;
+print !nil;
+print !0;
+print nil or "x";
+print false and 1;
+print 1 and 2;
+print 3 >= 3 and 2 < 1;
+var i = 0;
+while (i < 3) { print i; i = i + 1; }
+for (var j = 0; j < 3; j = j + 1) if (j == 1) print "one"; else print j;
+if (false) print 1 / 0; else print "pruned";
+var s = 0;
+for (var k = 1; k <= 100; k = k + 1) s = s + k;
+print s;
+print nil;
+print true;
+"""
+
+ARRAYS = """var a = [1, 2, 3];
+print a;
+print a[0] + a[2];
+a[1] = "two";
+print a;
+push(a, 4);
+print len(a);
+print len("hello");
+print sum([1, 2, 3.5]);
+print min([3, 1, 2]);
+print max([]);
+print join(["a", "b", "c"], "-");
+print split("a,b,c", ",");
+print split("abc", "");
+var r = range(0, 5);
+print r;
+print sum(r);
+var z = array(3);
+print z;
+fill(z, 7);
+print z;
+var c = copy(z);
+c[0] = 1;
+print z[0];
+print c[0];
+print "hello"[1];
+print [[1, 2], [3]][0][1];
+print [];
+print memo(sum)([1, 2]);
+"""
+
+PROGRAMS = {
+    "closures": (CLOSURES, ["1", "2", "1", "global", "global", "block", "50005000", "610", "<native fn>", "<fn counter>"]),
+    "values": (VALUES, ["6.5", "-1", "3.5", "0.30000000000000004", "abc", "True", "True", "False", "True", "False",
+                        "x", "False", "2", "False", "0", "1", "2", "0", "one", "2", "pruned", "5050", "null", "True"]),
+    "arrays": (ARRAYS, ["[1, 2, 3]", "4", "[1, two, 3]", "4", "5", "6.5", "1", "null", "a-b-c", "[a, b, c]", "[a, b, c]",
+                        "[0, 1, 2, 3, 4]", "10", "[null, null, null]", "[7, 7, 7]", "7", "1", "e", "2", "[]", "3"]),
+}
+
+# Statements that fail at runtime, each run between a print before it and
+# one after it that never happens; the error is on the statement's last line.
+RUNTIME_ERRORS = {
+    "print undefined;": "Undefined variable 'undefined'.",
+    "undefined = 1;": "Undefined variable 'undefined'.",
+    "fun f(a) {}\nf(1, 2);": "Expected 1 arguments but got 2",
+    "\"s\"();": "Can only call functions and classes.",
+    "print 1 + \"a\";": "Operands must be two numbers or two strings.",
+    "print -\"a\";": "Operand must be a number.",
+    "print 1 < \"a\";": "Operands must be numbers.",
+    "print 1 / 0;": "Division by zero.",
+    "print [1, 2][5];": "Index 5 is out of range for length 2.",
+    "print [1, 2][0.5];": "Index must be a whole number.",
+    "var a = [1];\na[\"x\"] = 2;": "Index must be a whole number.",
+    "print 1[0];": "Can only index arrays and strings.",
+    "print sum([1, \"a\"]);": "sum() needs an array of numbers.",
+    "print join([1], \",\");": "join() needs an array of strings.",
+    "print array(-1);": "array() needs a whole number of elements.",
+    "print len(3);": "len() needs an array.",
+    "var m = memo(clock);\nprint m(1);": "Expected 0 arguments but got 1",
+}
+
+# Scripts whose first statement doesn't compile, so even streamed nothing
+# runs, with what goes to stderr.
+COMPILE_ERRORS = {
+    "{ var a = a; }": ["[line 1] Error  at 'a': Can't read local variable in it's own initializer."],
+    "print (1;": ["[line 1] Error  at ';': Expect ')' after expression."],
+    "var = 1;": ["[line 1] Error  at '=': Expect variable name."],
+    "return 1;": ["[line 1] Error  at 'return': Can't return from top-level code."],
+    "print 1 @ 2;": ["[line 1] Error : Unexpected character.", "[line 1] Error  at '2': Expect ';' after value."],
+    "print \"unterminated;": ["[line 3] Error : Unterminated string.", "[line 2] Error  at 'after': Expect ';' after value."],
+}
+
+@pytest.mark.parametrize("options", CONFIGURATIONS, ids=" ".join)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_programs_print_the_same(tmp_path, name, options):
+    source, expected = PROGRAMS[name]
+    result = run(tmp_path, source, *options)
+    assert (result.returncode, result.stderr) == (0, "")
+    assert result.stdout.splitlines() == expected
+
+@pytest.mark.parametrize("options", CONFIGURATIONS, ids=" ".join)
+@pytest.mark.parametrize("statement", RUNTIME_ERRORS)
+def test_runtime_errors_are_the_same(tmp_path, statement, options):
+    line: int = statement.count("\n") + 2
+    result = run(tmp_path, f"print \"before\";\n{statement}\nprint \"after\";\n", *options)
+    assert result.returncode == 70, result.stderr
+    assert result.stdout == f"before\n{RUNTIME_ERRORS[statement]}\n[line {line}]\n"
+
+@pytest.mark.parametrize("options", CONFIGURATIONS, ids=" ".join)
+@pytest.mark.parametrize("statement", COMPILE_ERRORS)
+def test_compile_errors_are_the_same(tmp_path, statement, options):
+    result = run(tmp_path, f"{statement}\nprint \"after\";\n", *options)
+    assert (result.returncode, result.stdout) == (65, "")
+    expected: list[str] = COMPILE_ERRORS[statement]
+    if "--stream" in options:
+        # Scanning, and so reporting scanner errors, keeps pace with parsing
+        # rather than going first.
+        assert sorted(result.stderr.splitlines()) == sorted(expected)
+    else:
+        assert result.stderr.splitlines() == expected
+
+def session(engine: str, source: str) -> subprocess.CompletedProcess:
+    # The REPL, with the source typed in line by line and its prompts left
+    # out of what it printed.
+    result = subprocess.run([sys.executable, "__init__.py", f"--engine={engine}"], input=source,
+                            cwd=PYLOX, capture_output=True, text=True, timeout=60)
+    result.stdout = result.stdout.replace("pylox> ", "").replace("...... ", "")
+    return result
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_session_prints_the_same(name, engine):
+    source, expected = PROGRAMS[name]
+    result = session(engine, source)
+    assert (result.returncode, result.stderr) == (0, "")
+    assert result.stdout.splitlines() == expected
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_session_carries_on_after_errors(engine):
+    source = "var a = [1, 2];\nprint -\"a\";\nprint 1 +;\nfun f(x) {\n  return x * 2;\n}\nprint f(a[1]);\n"
+    result = session(engine, source)
+    assert result.returncode == 0
+    assert result.stdout == "Operand must be a number.\n[line 1]\n4\n"
+    assert result.stderr == "[line 1] Error  at ';': Expect expression.\n"
+
+PROGRAM = """
+import sys
+sys.path.insert(0, ".")
+from program import Program
+from stdlib import import_stdlib
+import_stdlib("asyncio")
+import asyncio
+
+source = sys.stdin.read()
+for optimize in (True, False):
+    program = Program.compile(source, optimize)
+    for result in (program.run(), asyncio.run(program.run_async())):
+        print(repr(result.output), result.error)
+"""
+
+def compiled(source: str) -> list[str]:
+    # What Program.run() and run_async() return, optimized and not, one
+    # line each.
+    result = subprocess.run([sys.executable, "-c", PROGRAM], input=source, cwd=PYLOX, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.splitlines()
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_program_prints_the_same(name):
+    source, expected = PROGRAMS[name]
+    output = "".join(line + "\n" for line in expected)
+    assert compiled(source) == [f"{output!r} None"] * 4
+
+@pytest.mark.parametrize("statement", RUNTIME_ERRORS)
+def test_program_fails_the_same(statement):
+    line: int = statement.count("\n") + 2
+    expected = f"'before\\n' [line {line}] Error: {RUNTIME_ERRORS[statement]}"
+    assert compiled(f"print \"before\";\n{statement}\nprint \"after\";\n") == [expected] * 4
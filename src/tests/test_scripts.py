@@ -0,0 +1,193 @@
+"""
+Runs Lox scripts through the pylox command line, in a subprocess each: the
+interpreter's token.py shadows the standard library's, so it can't share a
+process with pytest.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+PYLOX: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pylox")
+ENGINES = ("tree", "closure", "vm", "stack", "async")
+
+def run(tmp_path, source: str, *options: str) -> subprocess.CompletedProcess:
+    script = tmp_path / "script.lox"
+    script.write_text(source)
+    return subprocess.run([sys.executable, "__init__.py", "--no-cache", *options, str(script)],
+                          cwd=PYLOX, capture_output=True, text=True, timeout=60)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_top_level_return_is_an_error(tmp_path, engine):
+    result = run(tmp_path, "print 1;\nreturn;\nprint 2;\n", f"--engine={engine}")
+    assert result.returncode == 65
+    assert result.stdout == ""
+    assert "[line 2] Error  at 'return': Can't return from top-level code." in result.stderr
+
+def test_memo_leaves_async_natives_uncached(tmp_path):
+    result = run(tmp_path, "var s = memo(sleep);\ns(0);\ns(0);\nprint s == sleep;\n", "--engine=async")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "True\n"
+
+ASYNC_NATIVE_ERROR = """
+import sys
+sys.path.insert(0, ".")
+from program import Program
+from asyncinterpreter import AsyncNative
+from natives import NativeError
+from stdlib import import_stdlib
+import_stdlib("asyncio")
+import asyncio
+
+async def fetch(key):
+    raise NativeError("fetch() failed.")
+
+result = asyncio.run(Program.compile('print 1;\\nprint fetch("a");').run_async({"fetch": AsyncNative(fetch, 1)}))
+print(repr(result.output), result.error)
+"""
+
+def test_async_native_error_is_a_runtime_error():
+    result = subprocess.run([sys.executable, "-c", ASYNC_NATIVE_ERROR], cwd=PYLOX, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "'1\\n' [line 2] Error: fetch() failed.\n"
+
+PROGRAM_OPTIMIZE = """
+import sys
+sys.path.insert(0, ".")
+from __init__ import Pylox
+from program import Program
+
+# Only the argument decides, not the command line's setting.
+Pylox.optimize = False
+for optimize in (True, False):
+    program = Program.compile("print 1 + 2;", optimize)
+    print(type(program.statements[0].expression).__name__, program.run().output, end="")
+"""
+
+def test_program_optimizes_only_when_asked():
+    result = subprocess.run([sys.executable, "-c", PROGRAM_OPTIMIZE], cwd=PYLOX, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "Literal 3\nBinary 3\n"
+
+MEMO_WITH_ARRAYS = """
+var a = [1, 2, 3];
+var s = memo(sum);
+var n = memo(len);
+print s(a);
+push(a, 4);
+print s(a);
+a[0] = 11;
+print s(a);
+print n(a);
+fill(a, 0);
+print s(a);
+fun first(xs) { return xs[0]; }
+first = memo(first);
+print first(a);
+a[0] = 5;
+print first(a);
+"""
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_memo_sees_arrays_changed_between_calls(tmp_path, engine):
+    result = run(tmp_path, MEMO_WITH_ARRAYS, f"--engine={engine}")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["6", "10", "20", "4", "0", "0", "5"]
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_range_too_large_is_a_runtime_error(tmp_path, engine):
+    source = "var b = 10;\nfor (var i = 0; i < 10; i = i + 1) b = b * b;\nprint len(range(0, b));\n"
+    result = run(tmp_path, source, f"--engine={engine}")
+    assert result.returncode == 70
+    assert result.stdout == "range() can't make more than 134217728 elements.\n[line 3]\n"
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source", [
+    "print 1 / 0;",
+    "var a = 1;\nvar b = 0;\nprint a / b;",
+    "fun f(a) { return a / 0; }\nprint f(3);",
+    "fun f(a, b) { return a / b; }\nprint f(3, 0);",
+])
+def test_division_by_zero_is_a_runtime_error(tmp_path, engine, source):
+    result = run(tmp_path, source + "\n", f"--engine={engine}")
+    assert result.returncode == 70
+    assert result.stdout.startswith("Division by zero.\n[line ")
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unbounded_recursion_is_a_stack_overflow(tmp_path, engine):
+    result = run(tmp_path, "fun f() {\n  f();\n}\nf();\n", f"--engine={engine}")
+    assert result.returncode == 70
+    assert result.stdout == "Stack overflow.\n[line 2]\n"
+
+PROFILED = """fun f(n) {
+  if (n > 1) {
+    print "big";
+  }
+  return n;
+}
+var i = 1;
+while (i <= 3) {
+  f(i);
+  i = i + 1;
+}
+print "done";
+"""
+
+def test_profile_counts_statements_on_their_own_lines(tmp_path):
+    result = run(tmp_path, PROFILED, "--profile")
+    assert result.returncode == 0, result.stderr
+    report = result.stderr.splitlines()
+    rows = report[report.index(f"{'line':>6} {'hits':>12}") + 1:]
+    hits = dict(tuple(map(int, row.split())) for row in rows)
+    assert hits == {1: 1, 2: 3, 3: 2, 5: 3, 7: 1, 8: 1, 9: 3, 10: 3, 12: 1}
+
+def peak_memory(tmp_path, source: str, *options: str) -> int:
+    # Peak RSS of running a script, in kilobytes on Linux. The script runs
+    # under a process of its own, so no other child of this one counts.
+    script = tmp_path / "script.lox"
+    script.write_text(source)
+    command = [sys.executable, "__init__.py", "--no-cache", *options, str(script)]
+    measure = ("import resource, subprocess\n"
+               f"subprocess.run({command!r}, stdout=subprocess.DEVNULL, check=True)\n"
+               "print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)\n")
+    result = subprocess.run([sys.executable, "-c", measure], cwd=PYLOX, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return int(result.stdout)
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss is in kilobytes on Linux only")
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stream_memory_does_not_grow_with_the_script(tmp_path, engine):
+    def script(statements: int) -> str:
+        return "var a = 0;\n" + "a = a + 1;\n" * statements + "print a;\n"
+    short = peak_memory(tmp_path, script(5_000), "--stream", f"--engine={engine}")
+    long = peak_memory(tmp_path, script(40_000), "--stream", f"--engine={engine}")
+    assert long - short < 4 * 1024
+
+def test_batch_streams_scripts_with_stream(tmp_path):
+    # Streamed, the statement before the syntax error has already run.
+    result = run(tmp_path, "print 1;\nprint 2\n", "--batch", "--stream")
+    assert result.returncode == 65
+    assert "\n1\n[line 3] Error  at end: Expect ';' after value.\n" in result.stdout
+
+@pytest.mark.parametrize("option", ["--profile", "--dump-ast", "--interactive"])
+def test_batch_rejects_options_it_cannot_show(tmp_path, option):
+    result = run(tmp_path, "print 1;\n", "--batch", option)
+    assert result.returncode == 64
+    assert result.stdout.startswith("Usage: pylox")
+
+def test_plain_nodes_from_tool_run_on_every_engine(tmp_path):
+    # tool.py without --slots makes plain classes, which still carry the
+    # KIND and VISIT the dispatch tables are built from.
+    copy = tmp_path / "pylox"
+    shutil.copytree(PYLOX, copy, ignore=shutil.ignore_patterns("__pycache__", "__loxcache__"))
+    subprocess.run([sys.executable, "tool.py", "."], cwd=copy, check=True, timeout=60)
+    assert "__slots__" not in (copy / "expr.py").read_text()
+
+    script = tmp_path / "script.lox"
+    script.write_text("fun f(n) { if (n < 2) return n; return f(n - 1) + f(n - 2); }\nprint f(10);\n")
+    for options in [[f"--engine={engine}"] for engine in ENGINES] + [["--profile"]]:
+        result = subprocess.run([sys.executable, "__init__.py", "--no-cache", *options, str(script)],
+                                cwd=copy, capture_output=True, text=True, timeout=60)
+        assert (result.returncode, result.stdout) == (0, "55\n"), (options, result.stderr)